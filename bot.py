@@ -3,78 +3,85 @@ Shodan Telegram Bot — Local development entry point (polling mode).
 For Azure Functions deployment, use function_app.py instead.
 
 Usage:
-    python bot.py          → Run in polling mode (local dev)
-    python bot.py --setup  → Set webhook URL (for Azure Functions)
-    python bot.py --remove → Remove webhook (switch back to polling)
+    python bot.py           → Run in polling mode (local dev)
+    python bot.py --webhook → Run built-in webhook server (WEBHOOK_URL, WEBHOOK_SECRET, PORT, URL_PATH)
+    python bot.py --setup   → Set webhook URL (for Azure Functions)
+    python bot.py --remove  → Remove webhook (switch back to polling)
 """
 
 import sys
 import asyncio
 import logging
 
-from telegram import Update
+try:
+    import uvloop  # optional, POSIX only
+except ImportError:
+    uvloop = None
 
-from config import TELEGRAM_BOT_TOKEN, SHODAN_API_KEY, LOG_LEVEL
-from bot_app import build_application
+from config import get_config, ALLOWED_UPDATES
+from bot_app import build_application, get_application, shutdown_application, sync_bot_commands
+
+config = get_config()
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-)
 logger = logging.getLogger(__name__)
 
 
 async def setup_webhook(url: str):
     """Register webhook with Telegram."""
-    from telegram import BotCommand
-
-    app = build_application()
-    async with app:
-        result = await app.bot.set_webhook(
-            url=url,
-            allowed_updates=["message", "callback_query"],
-            drop_pending_updates=True,
-        )
-        # Set bot commands
-        commands = [
-            BotCommand("start", "Mulai bot & tampilkan menu"),
-            BotCommand("templates", "Template pencarian siap pakai"),
-            BotCommand("t", "Shortcut untuk /templates"),
-            BotCommand("search", "Pencarian Shodan langsung"),
-            BotCommand("count", "Hitung hasil (hemat credits)"),
-            BotCommand("host", "Lookup detail IP"),
-            BotCommand("dns", "DNS resolve hostname"),
-            BotCommand("rdns", "Reverse DNS lookup"),
-            BotCommand("domain", "Info DNS domain"),
-            BotCommand("exploit", "Cari exploit"),
-            BotCommand("honeypot", "Cek honeypot score"),
-            BotCommand("scan", "Request scan IP"),
-            BotCommand("scanstatus", "Cek status scan"),
-            BotCommand("info", "Cek akun & credits"),
-            BotCommand("filters", "Referensi filter Shodan"),
-            BotCommand("help", "Tampilkan bantuan"),
-        ]
-        await app.bot.set_my_commands(commands)
-        print(f"✅ Webhook {'set' if result else 'FAILED'}: {url}")
+    app = await get_application()
+    result = await app.bot.set_webhook(
+        url=url,
+        allowed_updates=ALLOWED_UPDATES,
+        drop_pending_updates=True,
+        max_connections=config.max_connections,
+    )
+    # Set bot commands — skipped when unchanged since the last run
+    await sync_bot_commands(app.bot)
+    print(f"✅ Webhook {'set' if result else 'FAILED'}: {url}")
 
 
 async def remove_webhook():
     """Remove webhook from Telegram."""
-    app = build_application()
-    async with app:
-        result = await app.bot.delete_webhook(drop_pending_updates=True)
-        print(f"✅ Webhook {'removed' if result else 'FAILED'}")
+    app = await get_application()
+    result = await app.bot.delete_webhook(drop_pending_updates=True)
+    print(f"✅ Webhook {'removed' if result else 'FAILED'}")
+
+
+async def _run_cli(coro):
+    """Run a CLI coroutine, then release the shared Application."""
+    try:
+        await coro
+    finally:
+        await shutdown_application()
+
+
+def _run(coro):
+    """asyncio.run, on a uvloop loop when uvloop is available."""
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
+
+
+def _use_uvloop_for_ptb():
+    """
+    Give PTB's run_polling/run_webhook a uvloop loop (libuv-backed, lower
+    per-callback overhead for Telegram + Shodan I/O). They run on the
+    current event loop, so set one explicitly instead of swapping the
+    global loop policy (uvloop.install() is deprecated).
+    """
+    if uvloop is not None:
+        asyncio.set_event_loop(uvloop.new_event_loop())
 
 
 def main():
     """Main entry point."""
-    if not TELEGRAM_BOT_TOKEN:
+    if not config.telegram_bot_token:
         logger.error(
             "❌ TELEGRAM_BOT_TOKEN not set! "
             "Copy .env.example to .env and fill in your tokens."
         )
         return
-    if not SHODAN_API_KEY:
+    if not config.shodan_api_key:
         logger.error(
             "❌ SHODAN_API_KEY not set! "
             "Copy .env.example to .env and fill in your tokens."
@@ -84,10 +91,32 @@ def main():
     # Handle CLI arguments
     if len(sys.argv) > 1:
         if sys.argv[1] == "--setup" and len(sys.argv) > 2:
-            asyncio.run(setup_webhook(sys.argv[2]))
+            _run(_run_cli(setup_webhook(sys.argv[2])))
+            return
+        elif sys.argv[1] == "--webhook":
+            if not config.webhook_url:
+                logger.error("❌ WEBHOOK_URL not set! Required for --webhook mode.")
+                return
+            # The listener is public; without a secret anyone could POST a
+            # forged update claiming an authorized user id
+            if not config.webhook_secret:
+                logger.error("❌ WEBHOOK_SECRET not set! Required for --webhook mode.")
+                return
+            logger.info("🚀 Starting Shodan Telegram Bot (webhook mode)...")
+            _use_uvloop_for_ptb()
+            app = build_application()
+            app.run_webhook(
+                listen="0.0.0.0",
+                port=config.port,
+                url_path=config.url_path,
+                webhook_url=config.webhook_url,
+                secret_token=config.webhook_secret,
+                max_connections=config.max_connections,
+                allowed_updates=ALLOWED_UPDATES,
+            )
             return
         elif sys.argv[1] == "--remove":
-            asyncio.run(remove_webhook())
+            _run(_run_cli(remove_webhook()))
             return
         elif sys.argv[1] == "--help":
             print(__doc__)
@@ -97,8 +126,15 @@ def main():
     logger.info("🚀 Starting Shodan Telegram Bot (polling mode)...")
     logger.info("   For Azure Functions, deploy with function_app.py")
 
+    _use_uvloop_for_ptb()
     app = build_application()
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    app.run_polling(
+        allowed_updates=ALLOWED_UPDATES,
+        poll_interval=0.0,
+        timeout=30,
+        bootstrap_retries=-1,
+        drop_pending_updates=True,
+    )
 
 
 if __name__ == "__main__":
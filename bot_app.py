@@ -6,10 +6,16 @@ Works for both:
   - Local development (polling mode) → used by bot.py
 """
 
+import os
+import asyncio
+import hashlib
 import logging
-from telegram import Update
+import re
+from telegram import BotCommand, Update
 from telegram.ext import (
+    AIORateLimiter,
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
@@ -17,107 +23,172 @@ from telegram.ext import (
     filters,
 )
 
-from config import TELEGRAM_BOT_TOKEN, LOG_LEVEL
+from config import get_config
+
+config = get_config()
 
-# ─── Logging ────────────────────────────────────────────────
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-)
 logger = logging.getLogger(__name__)
 
 # ─── Singleton application ──────────────────────────────────
 _application: Application | None = None
+_init_lock = asyncio.Lock()
+
+# Compiled once so repeated builds (polling restarts, tests) reuse it
+_DEFAULT_PARAM_PATTERN = re.compile(r"^default:", re.ASCII)
+
+# Command menu registered by bot.py --setup and the /api/setup function
+BOT_COMMANDS = (
+    BotCommand("start", "Mulai bot & tampilkan menu"),
+    BotCommand("templates", "Template pencarian siap pakai"),
+    BotCommand("t", "Shortcut untuk /templates"),
+    BotCommand("search", "Pencarian Shodan langsung"),
+    BotCommand("count", "Hitung hasil (hemat credits)"),
+    BotCommand("host", "Lookup detail IP"),
+    BotCommand("dns", "DNS resolve hostname"),
+    BotCommand("rdns", "Reverse DNS lookup"),
+    BotCommand("domain", "Info DNS domain"),
+    BotCommand("exploit", "Cari exploit"),
+    BotCommand("honeypot", "Cek honeypot score"),
+    BotCommand("scan", "Request scan IP"),
+    BotCommand("scanstatus", "Cek status scan"),
+    BotCommand("info", "Cek akun & credits"),
+    BotCommand("filters", "Referensi filter Shodan"),
+    BotCommand("help", "Tampilkan bantuan"),
+)
+
+# Hash of the last BOT_COMMANDS set registered (per process + CACHE_DIR file)
+_COMMANDS_HASH_FILE = ".bot_commands.hash"
+_synced_commands_hash: str | None = None
+
+
+async def _post_shutdown(app: Application) -> None:
+    """Close the Shodan client's HTTP session along with the Application."""
+    from shodan_client import shodan_client
+    await shodan_client.close()
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Process updates concurrently across users, but one at a time per user.
+    ConversationHandler state and user_data (awaiting, param_index,
+    template_values) are read-modify-write per user, so two quick messages
+    from the same user must not run in parallel.
+    Note: queued updates of one user still hold a concurrency slot while
+    they wait for that user's lock.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # user id → [lock, updates holding or waiting for it]
+        self._user_locks: dict[int, list] = {}
+
+    async def do_process_update(self, update, coroutine) -> None:
+        user = getattr(update, "effective_user", None)
+        if user is None:
+            await coroutine
+            return
+        entry = self._user_locks.get(user.id)
+        if entry is None:
+            entry = self._user_locks[user.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            # Drop idle locks so the dict doesn't grow with every user seen
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[user.id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
 
 
 def _build_application() -> Application:
     """Build the Application with all handlers registered."""
     import warnings
     from telegram.warnings import PTBUserWarning
-    from handlers import (
-        cmd_start, cmd_help, cmd_templates, cmd_search, cmd_count,
-        cmd_host, cmd_dns, cmd_rdns, cmd_domain, cmd_exploit,
-        cmd_honeypot, cmd_scan, cmd_scanstatus, cmd_info, cmd_filters,
-        callback_handler, handle_param_input, handle_default_param,
-        error_handler,
-        STATE_WAITING_PARAM, STATE_WAITING_RAW_QUERY, STATE_WAITING_HOST_IP,
-        STATE_WAITING_DNS, STATE_WAITING_EXPLOIT, STATE_WAITING_SCAN_IP,
-        STATE_WAITING_HONEYPOT_IP, STATE_WAITING_COUNT_QUERY,
-    )
+    # Local import: handlers pulls in the Shodan client, formatter and
+    # keyboards, which importing bot_app alone doesn't need
+    import handlers as h
 
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Separate pools: a large one for outbound API calls (send/edit/answer)
+    # and a small one for getUpdates long polling, so bursts of replies
+    # never starve (or get starved by) the polling connection.
+    # The API pool is sized to at least `concurrent_updates`, otherwise
+    # parallel handlers would just wait on each other for a connection.
+    # AIORateLimiter keeps bursts of chunked replies under Telegram's flood
+    # limits and waits out 429 RetryAfter itself before giving up.
+    # Updates from different users run in parallel; PerUserUpdateProcessor
+    # keeps each user's own updates strictly ordered.
+    app = (
+        Application.builder()
+        .token(config.telegram_bot_token)
+        .concurrent_updates(PerUserUpdateProcessor(config.concurrent_updates))
+        .connection_pool_size(max(config.httpx_pool_size, config.concurrent_updates))
+        .pool_timeout(config.httpx_pool_timeout)
+        .connect_timeout(10.0)
+        .read_timeout(30.0)
+        .write_timeout(30.0)
+        .get_updates_connection_pool_size(config.getupdates_pool_size)
+        .get_updates_pool_timeout(5.0)
+        .get_updates_read_timeout(35.0)
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     # Suppress per_message warning — we intentionally use per_message=False
     # because our callback handlers don't need per-message tracking.
     warnings.filterwarnings("ignore", category=PTBUserWarning)
 
+    # Every waiting state accepts the same two handlers, so build them once
+    # and share the instances instead of allocating a copy per state.
+    text_input_handler = MessageHandler(filters.TEXT & ~filters.COMMAND, h.handle_param_input)
+    state_handlers = [CallbackQueryHandler(h.callback_handler), text_input_handler]
+
+    # /start and /help stay real CommandHandlers; every other command goes
+    # through a single MessageHandler backed by handlers.COMMAND_MAP.
+    # Every handler is blocking: a non-blocking one would leave the
+    # conversation pending (dropping the user's other updates), and in the
+    # Azure path — where the Application is initialized but never started —
+    # its task would outlive the webhook invocation. Concurrency across
+    # users comes from concurrent_updates + PerUserUpdateProcessor instead.
     conv_handler = ConversationHandler(
         per_message=False,
         entry_points=[
-            CommandHandler("start", cmd_start),
-            CommandHandler("help", cmd_help),
-            CommandHandler("templates", cmd_templates),
-            CommandHandler("t", cmd_templates),
-            CommandHandler("search", cmd_search),
-            CommandHandler("count", cmd_count),
-            CommandHandler("host", cmd_host),
-            CommandHandler("dns", cmd_dns),
-            CommandHandler("rdns", cmd_rdns),
-            CommandHandler("domain", cmd_domain),
-            CommandHandler("exploit", cmd_exploit),
-            CommandHandler("honeypot", cmd_honeypot),
-            CommandHandler("scan", cmd_scan),
-            CommandHandler("scanstatus", cmd_scanstatus),
-            CommandHandler("info", cmd_info),
-            CommandHandler("filters", cmd_filters),
-            CallbackQueryHandler(callback_handler),
+            CommandHandler("start", h.cmd_start),
+            CommandHandler("help", h.cmd_help),
+            MessageHandler(filters.COMMAND, h.dispatch_command),
+            CallbackQueryHandler(h.callback_handler),
         ],
         states={
-            STATE_WAITING_PARAM: [
-                CallbackQueryHandler(handle_default_param, pattern=r"^default:"),
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_RAW_QUERY: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_HOST_IP: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_DNS: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_EXPLOIT: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_SCAN_IP: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_HONEYPOT_IP: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
-            ],
-            STATE_WAITING_COUNT_QUERY: [
-                CallbackQueryHandler(callback_handler),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
+            h.STATE_WAITING_PARAM: [
+                CallbackQueryHandler(h.handle_default_param, pattern=_DEFAULT_PARAM_PATTERN),
+                *state_handlers,
             ],
+            h.STATE_WAITING_RAW_QUERY: state_handlers,
+            h.STATE_WAITING_HOST_IP: state_handlers,
+            h.STATE_WAITING_DNS: state_handlers,
+            h.STATE_WAITING_EXPLOIT: state_handlers,
+            h.STATE_WAITING_SCAN_IP: state_handlers,
+            h.STATE_WAITING_HONEYPOT_IP: state_handlers,
+            h.STATE_WAITING_COUNT_QUERY: state_handlers,
         },
         fallbacks=[
-            CommandHandler("start", cmd_start),
-            CommandHandler("help", cmd_help),
-            CallbackQueryHandler(callback_handler),
-            MessageHandler(filters.TEXT & ~filters.COMMAND, handle_param_input),
+            CommandHandler("start", h.cmd_start),
+            CommandHandler("help", h.cmd_help),
+            CallbackQueryHandler(h.callback_handler),
+            text_input_handler,
         ],
         allow_reentry=True,
     )
 
     app.add_handler(conv_handler)
-    app.add_error_handler(error_handler)
+    app.add_error_handler(h.error_handler)
     return app
 
 
@@ -128,11 +199,57 @@ async def get_application() -> Application:
     """
     global _application
     if _application is None:
-        _application = _build_application()
-        await _application.initialize()
+        # Double-checked: concurrent cold invocations must not each build
+        # and initialize their own Application (and HTTPX pool).
+        async with _init_lock:
+            if _application is None:
+                app = _build_application()
+                await app.initialize()
+                _application = app
     return _application
 
 
+async def shutdown_application() -> None:
+    """Shut down the singleton Application (if any) and drop the reference."""
+    global _application
+    if _application is not None:
+        app, _application = _application, None
+        await app.shutdown()
+        # post_shutdown only runs under run_polling/run_webhook
+        await _post_shutdown(app)
+
+
+async def sync_bot_commands(bot) -> bool:
+    """
+    Register BOT_COMMANDS unless this exact set was already registered for
+    this bot. Returns True when set_my_commands was actually called.
+    The hash file is best effort — CACHE_DIR may be read-only (e.g. Azure
+    run-from-package), in which case only the in-process memo is kept.
+    """
+    global _synced_commands_hash
+    commands_hash = hashlib.sha1(
+        repr((bot.id, [(c.command, c.description) for c in BOT_COMMANDS])).encode()
+    ).hexdigest()
+    hash_file = os.path.join(config.cache_dir, _COMMANDS_HASH_FILE)
+    if _synced_commands_hash is None:
+        try:
+            with open(hash_file) as fh:
+                _synced_commands_hash = fh.read().strip()
+        except OSError:
+            _synced_commands_hash = ""
+    if _synced_commands_hash == commands_hash:
+        return False
+
+    await bot.set_my_commands(BOT_COMMANDS)
+    _synced_commands_hash = commands_hash
+    try:
+        with open(hash_file, "w") as fh:
+            fh.write(commands_hash)
+    except OSError as e:
+        logger.debug("Could not persist bot commands hash: %s", e)
+    return True
+
+
 def build_application() -> Application:
     """
     Build a new Application instance (for polling mode).
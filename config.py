@@ -6,6 +6,10 @@ Works with both:
 """
 
 import os
+import logging
+from types import MappingProxyType
+from dataclasses import dataclass
+from functools import lru_cache
 
 # Load .env file if it exists (local dev); in Azure Functions, env vars
 # are set via Application Settings and this is a no-op.
@@ -15,26 +19,125 @@ try:
 except ImportError:
     pass  # dotenv not needed in Azure Functions — env vars set via App Settings
 
+# ─── Environment snapshot ───────────────────────────────────
+@dataclass(frozen=True)
+class Config:
+    """Immutable snapshot of every env-driven setting, read once at import."""
+    telegram_bot_token: str
+    authorized_users: frozenset[int]
+    webhook_url: str
+    port: int
+    url_path: str
+    webhook_secret: str
+    max_connections: int
+    httpx_pool_size: int
+    httpx_pool_timeout: float
+    getupdates_pool_size: int
+    concurrent_updates: int
+    shodan_api_key: str
+    log_level: str
+    cache_dir: str
+
+
+def _env_number(name: str, default, cast):
+    """
+    Read a numeric env var, falling back to `default` on a malformed value.
+    Logged instead of raised: every entry point (including /api/health and
+    the webhook) builds the config, most of them never use these values.
+    """
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        logging.getLogger(__name__).warning(
+            "Invalid %s=%r, using default %r", name, raw, default
+        )
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    return _env_number(name, default, int)
+
+
+def _env_float(name: str, default: float) -> float:
+    return _env_number(name, default, float)
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Parse the environment once and return the cached snapshot."""
+    return Config(
+        # ─── Telegram ───────────────────────────────────────
+        telegram_bot_token=os.getenv("TELEGRAM_BOT_TOKEN", ""),
+        authorized_users=frozenset(
+            int(uid)
+            for uid in os.getenv("AUTHORIZED_USERS", "").split(",")
+            if uid.strip().isdigit()
+        ),
+        # ─── Webhook (bot.py --webhook) ─────────────────────
+        webhook_url=os.getenv("WEBHOOK_URL", ""),
+        port=_env_int("PORT", 8443),
+        url_path=os.getenv("URL_PATH", "webhook"),
+        # Sent by Telegram as X-Telegram-Bot-Api-Secret-Token on every update
+        webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+        max_connections=_env_int("TG_MAX_CONNECTIONS", 40),
+        # ─── HTTP connection pools (python-telegram-bot / HTTPX)
+        httpx_pool_size=_env_int("HTTPX_POOL_SIZE", 32),
+        httpx_pool_timeout=_env_float("HTTPX_POOL_TIMEOUT", 10.0),
+        getupdates_pool_size=_env_int("GETUPDATES_POOL_SIZE", 4),
+        # Updates processed in parallel; bot_app sizes the API pool to at
+        # least this, or concurrent handlers just wait for a free connection
+        concurrent_updates=_env_int("PTB_CONCURRENT_UPDATES", 64),
+        # ─── Shodan ─────────────────────────────────────────
+        shodan_api_key=os.getenv("SHODAN_API_KEY", ""),
+        # ─── Logging ────────────────────────────────────────
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        # ─── Local cache (bot.py --setup) ───────────────────
+        cache_dir=os.getenv("CACHE_DIR", "."),
+    )
+
+
+_config = get_config()
+
 # ─── Telegram ───────────────────────────────────────────────
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-AUTHORIZED_USERS = [
-    int(uid.strip())
-    for uid in os.getenv("AUTHORIZED_USERS", "").split(",")
-    if uid.strip().isdigit()
-]
+TELEGRAM_BOT_TOKEN = _config.telegram_bot_token
+AUTHORIZED_USERS = _config.authorized_users
+
+# Only update types the bot actually handles; shared by polling,
+# bot.py --webhook/--setup and the Azure Functions setup endpoint.
+ALLOWED_UPDATES = ("message", "callback_query")
 
 # ─── Shodan ─────────────────────────────────────────────────
-SHODAN_API_KEY = os.getenv("SHODAN_API_KEY", "")
+SHODAN_API_KEY = _config.shodan_api_key
 
 # ─── Logging ────────────────────────────────────────────────
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Resolved once to the numeric level; unknown names fall back to INFO
+LOG_LEVEL = logging.getLevelName(_config.log_level.upper())
+if not isinstance(LOG_LEVEL, int):
+    LOG_LEVEL = logging.INFO
+
+# Configured once here so every entry point (bot.py, bot_app.py,
+# function_app.py) shares the same format and level regardless of
+# import order. Azure Functions installs its own root handler already.
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=LOG_LEVEL,
+    )
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("telegram").setLevel(logging.WARNING)
+
+# ─── Local cache (bot.py --setup) ───────────────────────────
+CACHE_DIR = _config.cache_dir
 
 # ─── Display ────────────────────────────────────────────────
 MAX_RESULTS_PER_PAGE = 5
 MAX_MESSAGE_LENGTH = 4000  # Telegram limit ~4096
 
 # ─── Emojis for pretty output ───────────────────────────────
-EMOJI = {
+EMOJI = MappingProxyType({
     "search": "🔍",
     "host": "🖥️",
     "ip": "📡",
@@ -79,4 +182,51 @@ EMOJI = {
     "dot": "◽",
     "arrow": "➜",
     "separator": "─" * 30,
-}
+})
+
+# Flat constants for hot renderers
+E_SEARCH = EMOJI["search"]
+E_HOST = EMOJI["host"]
+E_IP = EMOJI["ip"]
+E_PORT = EMOJI["port"]
+E_VULN = EMOJI["vuln"]
+E_COUNTRY = EMOJI["country"]
+E_CITY = EMOJI["city"]
+E_ORG = EMOJI["org"]
+E_ISP = EMOJI["isp"]
+E_OS = EMOJI["os"]
+E_PRODUCT = EMOJI["product"]
+E_VERSION = EMOJI["version"]
+E_SSL = EMOJI["ssl"]
+E_WARNING = EMOJI["warning"]
+E_ERROR = EMOJI["error"]
+E_SUCCESS = EMOJI["success"]
+E_INFO = EMOJI["info"]
+E_STATS = EMOJI["stats"]
+E_GLOBE = EMOJI["globe"]
+E_KEY = EMOJI["key"]
+E_TIME = EMOJI["time"]
+E_TAG = EMOJI["tag"]
+E_LINK = EMOJI["link"]
+E_DNS = EMOJI["dns"]
+E_EXPLOIT = EMOJI["exploit"]
+E_CAMERA = EMOJI["camera"]
+E_DATABASE = EMOJI["database"]
+E_INDUSTRIAL = EMOJI["industrial"]
+E_HONEYPOT = EMOJI["honeypot"]
+E_STAR = EMOJI["star"]
+E_FIRE = EMOJI["fire"]
+E_LOCK = EMOJI["lock"]
+E_UNLOCK = EMOJI["unlock"]
+E_CHART = EMOJI["chart"]
+E_FOLDER = EMOJI["folder"]
+E_GEAR = EMOJI["gear"]
+E_ROCKET = EMOJI["rocket"]
+E_WAVE = EMOJI["wave"]
+E_DOWN = EMOJI["down"]
+E_RIGHT = EMOJI["right"]
+E_CHECK = EMOJI["check"]
+E_DOT = EMOJI["dot"]
+E_ARROW = EMOJI["arrow"]
+
+SEPARATOR = EMOJI["separator"]
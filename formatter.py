@@ -4,97 +4,213 @@ Formats Shodan results into clean, readable Telegram messages
 using HTML parse mode for rich formatting.
 """
 
-from config import EMOJI, MAX_RESULTS_PER_PAGE
+from config import (
+    EMOJI,
+    MAX_MESSAGE_LENGTH,
+    MAX_RESULTS_PER_PAGE,
+    E_ARROW,
+    E_CHART,
+    E_DNS,
+    E_DOT,
+    E_ERROR,
+    E_EXPLOIT,
+    E_FIRE,
+    E_FOLDER,
+    E_GEAR,
+    E_GLOBE,
+    E_HONEYPOT,
+    E_HOST,
+    E_INFO,
+    E_IP,
+    E_ORG,
+    E_PORT,
+    E_ROCKET,
+    E_SEARCH,
+    E_SSL,
+    E_STAR,
+    E_STATS,
+    E_SUCCESS,
+    E_TIME,
+    E_VULN,
+    E_WARNING,
+    E_WAVE,
+)
+import heapq
+from collections.abc import Iterator
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+
+@lru_cache(maxsize=64)
+def _border(ch: str, n: int) -> str:
+    """Return `ch` repeated `n` times, cached per (char, width)."""
+    return ch * n
+
+
+# ─── Static borders (built once, reused by every formatter) ─
+_BORDER_EQ_30 = _border("═", 30)
+_BORDER_EQ_32 = _border("═", 32)
+_BORDER_EQ_34 = _border("═", 34)
+_BORDER_DASH_28 = _border("─", 28)
+_BORDER_DASH_30 = _border("─", 30)
+_MINI_DIV = _border("┈", 28)
+_TOP_EQ = f"╔{_BORDER_EQ_32}╗"
+_BOT_EQ = f"╚{_BORDER_EQ_32}╝"
+_CARD_BOTTOM = f"└{_BORDER_DASH_28}┘"
+
+# Single-pass table for escape_html
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+# Ready-made "<emoji> " prefixes for key_value; "" means the plain bullet
+_KEY_PREFIX = {k: f"{v} " for k, v in EMOJI.items()}
+_KEY_PREFIX[""] = "  ◽ "
+
+# Every possible width-10 progress bar, indexed by filled cells
+_PROGRESS_BARS_10 = tuple("█" * i + "░" * (10 - i) for i in range(11))
+
+# section_header templates per emoji key; only the title is filled in
+_SECTION_TEMPLATE_CACHE = {
+    k: f"\n{v} <b>{{}}</b>\n{_BORDER_DASH_28}" for k, v in EMOJI.items()
+}
 
 
 def escape_html(text: str) -> str:
     """Escape HTML special characters for Telegram."""
     if not isinstance(text, str):
         text = str(text)
-    return (
-        text.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-    )
+    # Most Shodan fields (IPs, ports, CVE ids) need no escaping at all
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
+    return text.translate(_HTML_ESCAPE)
 
 
 def header_box(title: str, subtitle: str = "") -> str:
     """Create a beautiful header box."""
-    lines = [
-        f"╔{'═' * 32}╗",
-        f"║  {EMOJI['rocket']} <b>{escape_html(title)}</b>",
-    ]
     if subtitle:
-        lines.append(f"║  <i>{escape_html(subtitle)}</i>")
-    lines.append(f"╚{'═' * 32}╝")
-    return "\n".join(lines)
+        return (
+            f"{_TOP_EQ}\n║  {E_ROCKET} <b>{escape_html(title)}</b>\n"
+            f"║  <i>{escape_html(subtitle)}</i>\n{_BOT_EQ}"
+        )
+    return f"{_TOP_EQ}\n║  {E_ROCKET} <b>{escape_html(title)}</b>\n{_BOT_EQ}"
 
 
 def section_header(title: str, emoji_key: str = "info") -> str:
     """Create a section header."""
-    e = EMOJI.get(emoji_key, EMOJI["info"])
-    return f"\n{e} <b>{escape_html(title)}</b>\n{'─' * 28}"
+    template = _SECTION_TEMPLATE_CACHE.get(emoji_key, _SECTION_TEMPLATE_CACHE["info"])
+    return template.format(escape_html(title))
 
 
 def key_value(key: str, value, emoji_key: str = "") -> str:
-    """Format a key-value pair."""
-    e = f"{EMOJI.get(emoji_key, '')} " if emoji_key else "  ◽ "
-    v = escape_html(str(value)) if value else "<i>N/A</i>"
-    return f"{e}<b>{escape_html(key)}:</b> {v}"
+    """
+    Format a key-value pair.
+    `key` is always a literal label from this module, so it is not escaped.
+    """
+    e = _KEY_PREFIX.get(emoji_key, " ")
+    v = escape_html(value) if value else "<i>N/A</i>"
+    return f"{e}<b>{key}:</b> {v}"
 
 
 def mini_divider() -> str:
-    return "┈" * 28
+    return _MINI_DIV
 
 
 def format_number(n: int) -> str:
     """Format number with thousand separators."""
-    return f"{n:,}"
+    # No separator needed below four digits, so skip the grouping formatter
+    return str(n) if -1000 < n < 1000 else f"{n:,}"
+
+
+def iter_chunks(text: str, limit: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """
+    Yield pieces of `text` of at most `limit` chars, cut at paragraph
+    (then line) breaks. Cut points are found with rfind on the remaining
+    text, so splitting stays linear in the text length. Whitespace-only
+    pieces are skipped — Telegram rejects them as empty messages.
+    """
+    start, end = 0, len(text)
+    while end - start > limit:
+        cut = text.rfind("\n\n", start, start + limit)
+        if cut <= start:
+            cut = text.rfind("\n", start, start + limit)
+        if cut <= start:
+            cut = start + limit
+        piece = text[start:cut]
+        if piece.strip():
+            yield piece
+        start = cut
+        while start < end and text[start] == "\n":
+            start += 1
+    if start < end:
+        piece = text[start:]
+        if piece.strip():
+            yield piece
+
+
+def pack_messages(chunks, limit: int = MAX_MESSAGE_LENGTH, sep: str = "\n\n") -> Iterator[str]:
+    """
+    Greedily merge consecutive chunks (joined by `sep`) into messages of at
+    most `limit` chars, so e.g. a 5-card result page goes out as 1-2
+    messages instead of 6. Streams: each message is yielded as soon as the
+    next chunk would overflow it. Oversized chunks pass through as-is.
+    """
+    buf: list[str] = []
+    size = 0
+    for chunk in chunks:
+        extra = len(chunk) + (len(sep) if buf else 0)
+        if buf and size + extra > limit:
+            yield sep.join(buf)
+            buf, size = [], 0
+            extra = len(chunk)
+        buf.append(chunk)
+        size += extra
+    if buf:
+        yield sep.join(buf)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  SEARCH RESULTS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def format_search_results(data: dict, page: int = 1) -> list[str]:
+def format_search_results(data: dict, page: int = 1) -> Iterator[str]:
     """
     Format Shodan search results into Telegram messages.
-    Returns a list of messages (to handle length limits).
+    Yields one message at a time (to handle length limits), so the caller
+    can send the first one while the rest are still being rendered.
     """
     if "error" in data:
-        return [f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"]
+        yield f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
+        return
 
-    messages = []
     matches = data.get("matches", [])
     total = data.get("total", 0)
     query = data.get("query", "")
 
     # Header message
-    hdr = header_box("Hasil Pencarian Shodan", f"Query: {query}")
-    hdr += f"\n\n{EMOJI['stats']} <b>Total ditemukan:</b> {format_number(total)} hasil"
-    hdr += f"\n{EMOJI['info']} <b>Halaman:</b> {page} (menampilkan {len(matches)} hasil)"
+    hdr = (
+        f"{header_box('Hasil Pencarian Shodan', f'Query: {query}')}\n\n"
+        f"{E_STATS} <b>Total ditemukan:</b> {format_number(total)} hasil\n"
+        f"{E_INFO} <b>Halaman:</b> {page} (menampilkan {len(matches)} hasil)"
+    )
 
     # Facets if available
     facets = data.get("facets", {})
     if facets:
         hdr += format_facets(facets)
 
-    messages.append(hdr)
+    yield hdr
 
     # Individual results
-    for i, match in enumerate(matches[:MAX_RESULTS_PER_PAGE], 1):
-        msg = format_single_match(match, i + (page - 1) * MAX_RESULTS_PER_PAGE)
-        messages.append(msg)
+    offset = (page - 1) * MAX_RESULTS_PER_PAGE
+    for i, match in enumerate(islice(matches, MAX_RESULTS_PER_PAGE), offset + 1):
+        yield "\n".join(_iter_single_match_lines(match, i))
 
     if not matches:
-        messages.append(f"\n{EMOJI['warning']} <i>Tidak ada hasil untuk query ini.</i>")
+        yield f"\n{E_WARNING} <i>Tidak ada hasil untuk query ini.</i>"
 
-    return messages
 
-
-def format_single_match(match: dict, index: int = 1) -> str:
-    """Format a single search result match."""
+def _iter_single_match_lines(match: dict, index: int):
+    """Yield the lines of a single search result card."""
     ip = match.get("ip_str", "N/A")
     port = match.get("port", "N/A")
     org = match.get("org", "N/A")
@@ -109,27 +225,25 @@ def format_single_match(match: dict, index: int = 1) -> str:
     ssl_info = match.get("ssl", {})
     timestamp = match.get("timestamp", "")
 
-    lines = [
-        f"┌─── {EMOJI['host']} <b>Hasil #{index}</b> ───┐",
-        "",
-        key_value("IP", ip, "ip"),
-        key_value("Port", port, "port"),
-        key_value("Organisasi", org, "org"),
-        key_value("ISP", isp, "isp"),
-    ]
+    yield f"┌─── {E_HOST} <b>Hasil #{index}</b> ───┐"
+    yield ""
+    yield key_value("IP", ip, "ip")
+    yield key_value("Port", port, "port")
+    yield key_value("Organisasi", org, "org")
+    yield key_value("ISP", isp, "isp")
 
     if product:
         prod_str = f"{product} {version}".strip()
-        lines.append(key_value("Product", prod_str, "product"))
+        yield key_value("Product", prod_str, "product")
 
     if os_name:
-        lines.append(key_value("OS", os_name, "os"))
+        yield key_value("OS", os_name, "os")
 
-    lines.append(key_value("Negara", country, "country"))
-    lines.append(key_value("Kota", city, "city"))
+    yield key_value("Negara", country, "country")
+    yield key_value("Kota", city, "city")
 
     if hostnames:
-        lines.append(key_value("Hostname", ", ".join(hostnames[:3]), "dns"))
+        yield key_value("Hostname", ", ".join(islice(hostnames, 3)), "dns")
 
     # SSL Info
     if ssl_info:
@@ -138,38 +252,41 @@ def format_single_match(match: dict, index: int = 1) -> str:
             subject = cert.get("subject", {})
             cn = subject.get("CN", "")
             if cn:
-                lines.append(key_value("SSL CN", cn, "ssl"))
+                yield key_value("SSL CN", cn, "ssl")
             expires = cert.get("expires", "")
             if expires:
-                lines.append(key_value("SSL Expires", expires, "time"))
+                yield key_value("SSL Expires", expires, "time")
 
     # Vulnerabilities
     if vulns:
-        vuln_list = list(vulns.keys())[:5]
-        lines.append(f"\n  {EMOJI['vuln']} <b>Vulnerabilities ({len(vulns)}):</b>")
-        for v in vuln_list:
-            lines.append(f"    {EMOJI['fire']} <code>{escape_html(v)}</code>")
+        yield f"\n  {E_VULN} <b>Vulnerabilities ({len(vulns)}):</b>"
+        esc = escape_html
+        for v in islice(vulns, 5):
+            yield f"    {E_FIRE} <code>{esc(v)}</code>"
         if len(vulns) > 5:
-            lines.append(f"    <i>... dan {len(vulns) - 5} lainnya</i>")
+            yield f"    <i>... dan {len(vulns) - 5} lainnya</i>"
 
     # Banner snippet
     banner = match.get("data", "")
     if banner:
         snippet = banner[:200].strip()
-        lines.append(f"\n  {EMOJI['folder']} <b>Banner:</b>")
-        lines.append(f"  <code>{escape_html(snippet)}</code>")
+        yield f"\n  {E_FOLDER} <b>Banner:</b>"
+        yield f"  <code>{escape_html(snippet)}</code>"
 
     if timestamp:
-        lines.append(f"\n  {EMOJI['time']} <i>Last seen: {escape_html(timestamp[:19])}</i>")
+        yield f"\n  {E_TIME} <i>Last seen: {escape_html(timestamp[:19])}</i>"
 
-    lines.append(f"\n└{'─' * 28}┘")
+    yield f"\n{_CARD_BOTTOM}"
 
-    return "\n".join(lines)
+
+def format_single_match(match: dict, index: int = 1) -> str:
+    """Format a single search result match."""
+    return "\n".join(_iter_single_match_lines(match, index))
 
 
 def format_facets(facets: dict) -> str:
     """Format facet data into a readable summary."""
-    lines = [f"\n\n{'─' * 28}", f"{EMOJI['chart']} <b>Statistik Breakdown:</b>"]
+    lines = [f"\n\n{_BORDER_DASH_28}", f"{E_CHART} <b>Statistik Breakdown:</b>"]
 
     facet_labels = {
         "org": ("🏢", "Top Organisasi"),
@@ -187,7 +304,7 @@ def format_facets(facets: dict) -> str:
     for facet_name, values in facets.items():
         label_emoji, label_text = facet_labels.get(facet_name, ("📊", facet_name.title()))
         lines.append(f"\n{label_emoji} <b>{label_text}:</b>")
-        for item in values[:8]:
+        for item in islice(values, 8):
             val = item.get("value", "N/A")
             count = item.get("count", 0)
             bar = progress_bar(count, values[0]["count"] if values else 1, width=10)
@@ -203,6 +320,8 @@ def progress_bar(value: int, max_value: int, width: int = 10) -> str:
     else:
         ratio = value / max_value
     filled = int(width * ratio)
+    if width == 10 and 0 <= filled <= 10:
+        return _PROGRESS_BARS_10[filled]
     return "█" * filled + "░" * (width - filled)
 
 
@@ -210,10 +329,11 @@ def progress_bar(value: int, max_value: int, width: int = 10) -> str:
 #  HOST INFO
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def format_host_info(data: dict) -> list[str]:
-    """Format host lookup results."""
+def format_host_info(data: dict) -> Iterator[str]:
+    """Format host lookup results, yielding one message at a time."""
     if "error" in data:
-        return [f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"]
+        yield f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
+        return
 
     ip = data.get("ip_str", "N/A")
     org = data.get("org", "N/A")
@@ -228,8 +348,6 @@ def format_host_info(data: dict) -> list[str]:
     asn = data.get("asn", "N/A")
     services = data.get("data", [])
 
-    messages = []
-
     # Main info
     lines = [
         header_box(f"Host: {ip}", f"Informasi lengkap untuk {ip}"),
@@ -245,7 +363,7 @@ def format_host_info(data: dict) -> list[str]:
     ]
 
     if hostnames:
-        lines.append(key_value("Hostnames", ", ".join(hostnames[:5]), "dns"))
+        lines.append(key_value("Hostnames", ", ".join(islice(hostnames, 5)), "dns"))
 
     if last_update:
         lines.append(key_value("Last Update", last_update[:19], "time"))
@@ -253,46 +371,54 @@ def format_host_info(data: dict) -> list[str]:
     # Ports
     if ports:
         lines.append(section_header(f"Open Ports ({len(ports)})", "port"))
-        port_str = ", ".join(str(p) for p in sorted(ports)[:30])
+        port_str = ", ".join(str(p) for p in heapq.nsmallest(30, ports))
         lines.append(f"  <code>{escape_html(port_str)}</code>")
 
     # Vulnerabilities
     if vulns:
         lines.append(section_header(f"Vulnerabilities ({len(vulns)})", "vuln"))
-        for v in vulns[:10]:
-            lines.append(f"  {EMOJI['fire']} <code>{escape_html(v)}</code>")
+        for v in islice(vulns, 10):
+            lines.append(f"  {E_FIRE} <code>{escape_html(v)}</code>")
         if len(vulns) > 10:
             lines.append(f"  <i>... dan {len(vulns) - 10} lainnya</i>")
 
-    messages.append("\n".join(lines))
+    yield "\n".join(lines)
 
     # Services detail (separate messages)
-    for svc in services[:8]:
-        msg = format_service_detail(svc, ip)
-        messages.append(msg)
-
-    return messages
+    for svc in islice(services, 8):
+        yield format_service_detail(svc, ip)
+
+
+# Pre-rendered pieces for format_service_detail. Every field there is
+# guarded by `if value`, so key_value's N/A branch is never needed and
+# each line is just a baked prefix plus the escaped value.
+_SERVICE_HEAD = f"┌─── {E_PORT} <b>Port {{}}/{{}}</b> ───\n"
+_SERVICE_BANNER = f"\n  {E_FOLDER} <b>Banner:</b>"
+_SERVICE_TAIL = f"\n{_CARD_BOTTOM}"
+(
+    _SVC_PRODUCT, _SVC_MODULE, _SVC_TITLE, _SVC_STATUS,
+    _SVC_SERVER, _SVC_SSL_CN, _SVC_ISSUER,
+) = (
+    f"{_KEY_PREFIX.get(emoji_key, ' ')}<b>{label}:</b> "
+    for label, emoji_key in (
+        ("Product", "product"), ("Module", "gear"), ("Title", "globe"),
+        ("Status", "check"), ("Server", "host"), ("SSL CN", "ssl"),
+        ("Issuer", "lock"),
+    )
+)
 
 
 def format_service_detail(svc: dict, ip: str) -> str:
     """Format a single service/port detail."""
-    port = svc.get("port", "?")
-    transport = svc.get("transport", "tcp")
-    product = svc.get("product", "")
-    version = svc.get("version", "")
-    module = svc.get("_shodan", {}).get("module", "")
-    banner = svc.get("data", "")
-    ssl_info = svc.get("ssl", {})
-
-    lines = [
-        f"┌─── {EMOJI['port']} <b>Port {port}/{transport}</b> ───",
-        "",
-    ]
+    lines = [_SERVICE_HEAD.format(svc.get("port", "?"), svc.get("transport", "tcp"))]
+    add = lines.append
 
+    product = svc.get("product", "")
     if product:
-        lines.append(key_value("Product", f"{product} {version}".strip(), "product"))
+        add(_SVC_PRODUCT + escape_html(f"{product} {svc.get('version', '')}".strip()))
+    module = svc.get("_shodan", {}).get("module", "")
     if module:
-        lines.append(key_value("Module", module, "gear"))
+        add(_SVC_MODULE + escape_html(module))
 
     # HTTP info
     http = svc.get("http", {})
@@ -301,30 +427,31 @@ def format_service_detail(svc: dict, ip: str) -> str:
         status = http.get("status", "")
         server = http.get("server", "")
         if title:
-            lines.append(key_value("Title", title[:80], "globe"))
+            add(_SVC_TITLE + escape_html(title[:80]))
         if status:
-            lines.append(key_value("Status", status, "check"))
+            add(_SVC_STATUS + escape_html(status))
         if server:
-            lines.append(key_value("Server", server, "host"))
+            add(_SVC_SERVER + escape_html(server))
 
     # SSL
+    ssl_info = svc.get("ssl", {})
     if ssl_info:
         cert = ssl_info.get("cert", {})
         if cert:
             cn = cert.get("subject", {}).get("CN", "")
             issuer = cert.get("issuer", {}).get("O", "")
             if cn:
-                lines.append(key_value("SSL CN", cn, "ssl"))
+                add(_SVC_SSL_CN + escape_html(cn))
             if issuer:
-                lines.append(key_value("Issuer", issuer, "lock"))
+                add(_SVC_ISSUER + escape_html(issuer))
 
     # Banner
+    banner = svc.get("data", "")
     if banner:
-        snippet = banner[:300].strip()
-        lines.append(f"\n  {EMOJI['folder']} <b>Banner:</b>")
-        lines.append(f"  <code>{escape_html(snippet)}</code>")
+        add(_SERVICE_BANNER)
+        add(f"  <code>{escape_html(banner[:300].strip())}</code>")
 
-    lines.append(f"\n└{'─' * 28}┘")
+    add(_SERVICE_TAIL)
     return "\n".join(lines)
 
 
@@ -335,39 +462,37 @@ def format_service_detail(svc: dict, ip: str) -> str:
 def format_dns_resolve(data: dict) -> str:
     """Format DNS resolution results."""
     if "error" in data:
-        return f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"
+        return f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
 
+    # "error" was handled above, so every remaining key is a real entry
     lines = [header_box("DNS Resolve"), ""]
     for hostname, ip in data.items():
-        if hostname == "error":
-            continue
-        lines.append(f"  {EMOJI['dns']} <code>{escape_html(hostname)}</code>")
-        lines.append(f"    {EMOJI['arrow']} <code>{escape_html(str(ip))}</code>")
+        lines.append(f"  {E_DNS} <code>{escape_html(hostname)}</code>")
+        lines.append(f"    {E_ARROW} <code>{escape_html(str(ip))}</code>")
     return "\n".join(lines)
 
 
 def format_dns_reverse(data: dict) -> str:
     """Format reverse DNS results."""
     if "error" in data:
-        return f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"
+        return f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
 
+    # "error" was handled above, so every remaining key is a real entry
     lines = [header_box("Reverse DNS"), ""]
     for ip, hostnames in data.items():
-        if ip == "error":
-            continue
-        lines.append(f"  {EMOJI['ip']} <code>{escape_html(ip)}</code>")
+        lines.append(f"  {E_IP} <code>{escape_html(ip)}</code>")
         if isinstance(hostnames, list):
             for h in hostnames:
-                lines.append(f"    {EMOJI['arrow']} <code>{escape_html(h)}</code>")
+                lines.append(f"    {E_ARROW} <code>{escape_html(h)}</code>")
         else:
-            lines.append(f"    {EMOJI['arrow']} <code>{escape_html(str(hostnames))}</code>")
+            lines.append(f"    {E_ARROW} <code>{escape_html(str(hostnames))}</code>")
     return "\n".join(lines)
 
 
 def format_domain_info(data: dict) -> str:
     """Format domain info results."""
     if "error" in data:
-        return f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"
+        return f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
 
     domain = data.get("domain", "N/A")
     subdomains = data.get("subdomains", [])
@@ -379,14 +504,14 @@ def format_domain_info(data: dict) -> str:
         section_header("Subdomains", "dns"),
     ]
 
-    for sub in subdomains[:20]:
-        lines.append(f"  {EMOJI['dot']} <code>{escape_html(sub)}.{escape_html(domain)}</code>")
+    for sub in islice(subdomains, 20):
+        lines.append(f"  {E_DOT} <code>{escape_html(sub)}.{escape_html(domain)}</code>")
     if len(subdomains) > 20:
         lines.append(f"  <i>... dan {len(subdomains) - 20} lainnya</i>")
 
     if records:
         lines.append(section_header("DNS Records", "globe"))
-        for rec in records[:15]:
+        for rec in islice(records, 15):
             rtype = rec.get("type", "?")
             value = rec.get("value", "N/A")
             subdomain = rec.get("subdomain", "")
@@ -404,22 +529,21 @@ def format_domain_info(data: dict) -> str:
 #  EXPLOITS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def format_exploits(data: dict) -> list[str]:
-    """Format exploit search results."""
+def format_exploits(data: dict) -> Iterator[str]:
+    """Format exploit search results, yielding one message at a time."""
     if "error" in data:
-        return [f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"]
+        yield f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
+        return
 
     matches = data.get("matches", [])
     total = data.get("total", 0)
     query = data.get("query", "")
 
-    messages = []
-
     hdr = header_box("Exploit Search", f"Query: {query}")
-    hdr += f"\n\n{EMOJI['stats']} <b>Total:</b> {format_number(total)} exploits found"
-    messages.append(hdr)
+    hdr += f"\n\n{E_STATS} <b>Total:</b> {format_number(total)} exploits found"
+    yield hdr
 
-    for i, exp in enumerate(matches[:10], 1):
+    for i, exp in enumerate(islice(matches, 10), 1):
         desc = exp.get("description", "N/A")[:300]
         source = exp.get("source", "N/A")
         exp_id = exp.get("id", "N/A")
@@ -427,22 +551,20 @@ def format_exploits(data: dict) -> list[str]:
         exp_type = exp.get("type", "N/A")
 
         lines = [
-            f"┌─── {EMOJI['exploit']} <b>Exploit #{i}</b> ───",
+            f"┌─── {E_EXPLOIT} <b>Exploit #{i}</b> ───",
             key_value("ID", exp_id, "key"),
             key_value("Source", source, "link"),
             key_value("Type", exp_type, "tag"),
         ]
         if cve_list:
-            lines.append(key_value("CVE", ", ".join(cve_list[:5]), "vuln"))
-        lines.append(f"\n  {EMOJI['info']} <b>Description:</b>")
+            lines.append(key_value("CVE", ", ".join(islice(cve_list, 5)), "vuln"))
+        lines.append(f"\n  {E_INFO} <b>Description:</b>")
         lines.append(f"  <i>{escape_html(desc)}</i>")
-        lines.append(f"└{'─' * 28}┘")
-        messages.append("\n".join(lines))
+        lines.append(_CARD_BOTTOM)
+        yield "\n".join(lines)
 
     if not matches:
-        messages.append(f"{EMOJI['warning']} <i>Tidak ada exploit ditemukan.</i>")
-
-    return messages
+        yield f"{E_WARNING} <i>Tidak ada exploit ditemukan.</i>"
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -451,16 +573,14 @@ def format_exploits(data: dict) -> list[str]:
 
 def format_api_info(info: dict) -> str:
     """Format API account info."""
-    lines = [
-        header_box("Shodan Account Info"),
-        "",
-        key_value("Plan", info.get("plan", "?"), "star"),
-        key_value("Query Credits", format_number(info.get("query_credits", 0)), "search"),
-        key_value("Scan Credits", format_number(info.get("scan_credits", 0)), "ip"),
-        key_value("Unlocked", "Ya ✅" if info.get("unlocked") else "Tidak", "lock"),
-        key_value("Unlocked Left", format_number(info.get("unlocked_left", 0)), "key"),
-    ]
-    return "\n".join(lines)
+    return (
+        f"{header_box('Shodan Account Info')}\n\n"
+        f"{key_value('Plan', info.get('plan', '?'), 'star')}\n"
+        f"{key_value('Query Credits', format_number(info.get('query_credits', 0)), 'search')}\n"
+        f"{key_value('Scan Credits', format_number(info.get('scan_credits', 0)), 'ip')}\n"
+        f"{key_value('Unlocked', 'Ya ✅' if info.get('unlocked') else 'Tidak', 'lock')}\n"
+        f"{key_value('Unlocked Left', format_number(info.get('unlocked_left', 0)), 'key')}"
+    )
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -470,44 +590,40 @@ def format_api_info(info: dict) -> str:
 def format_scan_result(data: dict) -> str:
     """Format scan submission result."""
     if "error" in data:
-        return f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"
+        return f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
 
     scan_id = data.get("id", "N/A")
     count = data.get("count", 0)
     credits_left = data.get("credits_left", 0)
 
-    lines = [
-        header_box("Scan Submitted"),
-        "",
-        key_value("Scan ID", scan_id, "key"),
-        key_value("IPs to scan", count, "ip"),
-        key_value("Credits left", credits_left, "stats"),
-        f"\n{EMOJI['info']} <i>Gunakan /scanstatus {scan_id} untuk cek progress</i>",
-    ]
-    return "\n".join(lines)
+    return (
+        f"{header_box('Scan Submitted')}\n\n"
+        f"{key_value('Scan ID', scan_id, 'key')}\n"
+        f"{key_value('IPs to scan', count, 'ip')}\n"
+        f"{key_value('Credits left', credits_left, 'stats')}\n"
+        f"\n{E_INFO} <i>Gunakan /scanstatus {scan_id} untuk cek progress</i>"
+    )
 
 
 def format_scan_status(data: dict) -> str:
     """Format scan status result."""
     if "error" in data:
-        return f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}"
+        return f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}"
 
     status = data.get("status", "unknown")
     scan_id = data.get("id", "N/A")
 
     status_emoji = {
-        "DONE": EMOJI["success"],
+        "DONE": E_SUCCESS,
         "SUBMITTING": "⏳",
         "QUEUE": "📋",
     }.get(status, "❓")
 
-    lines = [
-        header_box("Scan Status"),
-        "",
-        key_value("Scan ID", scan_id, "key"),
-        f"  {status_emoji} <b>Status:</b> {escape_html(status)}",
-    ]
-    return "\n".join(lines)
+    return (
+        f"{header_box('Scan Status')}\n\n"
+        f"{key_value('Scan ID', scan_id, 'key')}\n"
+        f"  {status_emoji} <b>Status:</b> {escape_html(status)}"
+    )
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -517,46 +633,43 @@ def format_scan_status(data: dict) -> str:
 def format_honeypot_score(ip: str, score: float) -> str:
     """Format honeypot detection result."""
     if score < 0:
-        return f"{EMOJI['error']} Tidak bisa mengecek honeypot score untuk <code>{escape_html(ip)}</code>"
+        return f"{E_ERROR} Tidak bisa mengecek honeypot score untuk <code>{escape_html(ip)}</code>"
 
     if score >= 0.8:
-        verdict = f"{EMOJI['honeypot']} <b>Kemungkinan besar HONEYPOT</b>"
+        verdict = f"{E_HONEYPOT} <b>Kemungkinan besar HONEYPOT</b>"
     elif score >= 0.5:
-        verdict = f"{EMOJI['warning']} <b>Mungkin honeypot</b>"
+        verdict = f"{E_WARNING} <b>Mungkin honeypot</b>"
     else:
-        verdict = f"{EMOJI['success']} <b>Kemungkinan bukan honeypot</b>"
+        verdict = f"{E_SUCCESS} <b>Kemungkinan bukan honeypot</b>"
 
     bar = progress_bar(int(score * 10), 10, width=10)
-    lines = [
-        header_box("Honeypot Detection", f"IP: {ip}"),
-        "",
-        key_value("IP", ip, "ip"),
-        f"  {EMOJI['honeypot']} <b>Score:</b> {score:.2f} / 1.00",
-        f"  {bar}",
-        f"\n  {verdict}",
-    ]
-    return "\n".join(lines)
+    return (
+        f"{header_box('Honeypot Detection', f'IP: {ip}')}\n\n"
+        f"{key_value('IP', ip, 'ip')}\n"
+        f"  {E_HONEYPOT} <b>Score:</b> {score:.2f} / 1.00\n"
+        f"  {bar}\n"
+        f"\n  {verdict}"
+    )
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  HELP / WELCOME
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def format_welcome() -> str:
-    """Format welcome/help message."""
-    return f"""
-╔{'═' * 34}╗
-║  {EMOJI['rocket']} <b>Shodan Telegram Bot</b>
+# Both texts are static, so they are rendered once at import
+_WELCOME_TEXT = f"""
+╔{_BORDER_EQ_34}╗
+║  {E_ROCKET} <b>Shodan Telegram Bot</b>
 ║  <i>Powered by Shodan Academic Plus</i>
-╚{'═' * 34}╝
+╚{_BORDER_EQ_34}╝
 
-{EMOJI['wave']} <b>Selamat datang!</b>
+{E_WAVE} <b>Selamat datang!</b>
 Bot ini mempermudah penggunaan Shodan
 langsung dari Telegram dengan template
 pencarian yang siap pakai.
 
-{'─' * 30}
-{EMOJI['search']} <b>PERINTAH UTAMA:</b>
+{_BORDER_DASH_30}
+{E_SEARCH} <b>PERINTAH UTAMA:</b>
 
   /search <code>[query]</code>
   Pencarian langsung dengan query Shodan
@@ -570,8 +683,8 @@ pencarian yang siap pakai.
   /count <code>[query]</code>
   Hitung hasil tanpa pakai credits
 
-{'─' * 30}
-{EMOJI['dns']} <b>DNS & DOMAIN:</b>
+{_BORDER_DASH_30}
+{E_DNS} <b>DNS & DOMAIN:</b>
 
   /dns <code>[hostname]</code>
   Resolve hostname ke IP
@@ -582,8 +695,8 @@ pencarian yang siap pakai.
   /domain <code>[domain]</code>
   Info DNS records sebuah domain
 
-{'─' * 30}
-{EMOJI['exploit']} <b>EXPLOIT & VULN:</b>
+{_BORDER_DASH_30}
+{E_EXPLOIT} <b>EXPLOIT & VULN:</b>
 
   /exploit <code>[query]</code>
   Cari exploit berdasarkan keyword
@@ -591,8 +704,8 @@ pencarian yang siap pakai.
   /honeypot <code>[IP]</code>
   Cek apakah IP itu honeypot
 
-{'─' * 30}
-{EMOJI['ip']} <b>SCANNING:</b>
+{_BORDER_DASH_30}
+{E_IP} <b>SCANNING:</b>
 
   /scan <code>[IP/CIDR]</code>
   Request scan Shodan untuk IP/network
@@ -600,72 +713,79 @@ pencarian yang siap pakai.
   /scanstatus <code>[scan_id]</code>
   Cek status scan yang sedang berjalan
 
-{'─' * 30}
-{EMOJI['gear']} <b>LAINNYA:</b>
+{_BORDER_DASH_30}
+{E_GEAR} <b>LAINNYA:</b>
 
   /info — Cek status akun & credits
   /filters — Daftar filter Shodan
   /help — Tampilkan bantuan ini
 
-{'─' * 30}
-{EMOJI['star']} <b>TIPS:</b>
+{_BORDER_DASH_30}
+{E_STAR} <b>TIPS:</b>
 Gunakan /templates untuk pencarian
 cepat dengan template siap pakai!
 Tinggal pilih, isi parameter, selesai! ✨
 """
 
+_FILTERS_TEXT = f"""
+{E_SEARCH} <b>SHODAN FILTER REFERENCE</b>
+{_BORDER_EQ_30}
 
-def format_filters_help() -> str:
-    """Format Shodan filters reference."""
-    return f"""
-{EMOJI['search']} <b>SHODAN FILTER REFERENCE</b>
-{'═' * 30}
-
-{EMOJI['globe']} <b>Lokasi:</b>
+{E_GLOBE} <b>Lokasi:</b>
   <code>country:"ID"</code> — Kode negara
   <code>city:"Jakarta"</code> — Kota
   <code>region:"West Java"</code> — Provinsi/Region
 
-{EMOJI['org']} <b>Organisasi:</b>
+{E_ORG} <b>Organisasi:</b>
   <code>org:"Telkom"</code> — Nama organisasi
   <code>isp:"Telkomsel"</code> — Nama ISP
   <code>asn:AS17974</code> — ASN number
   <code>net:202.134.0.0/16</code> — Subnet CIDR
 
-{EMOJI['port']} <b>Service:</b>
+{E_PORT} <b>Service:</b>
   <code>port:22</code> — Nomor port
   <code>product:"nginx"</code> — Nama product
   <code>version:"1.19"</code> — Versi product
   <code>os:"Windows"</code> — Operating system
 
-{EMOJI['globe']} <b>HTTP:</b>
+{E_GLOBE} <b>HTTP:</b>
   <code>http.title:"Login"</code> — Title halaman
   <code>http.server:"Apache"</code> — Web server
   <code>http.status:200</code> — HTTP status
   <code>http.component:"jQuery"</code> — Web tech
   <code>http.favicon.hash:NNN</code> — Favicon hash
 
-{EMOJI['ssl']} <b>SSL/TLS:</b>
+{E_SSL} <b>SSL/TLS:</b>
   <code>ssl.cert.subject.CN:"*.example.com"</code>
   <code>ssl.cert.subject.O:"Org Name"</code>
   <code>ssl.cert.expired:true</code>
   <code>has_ssl:true</code>
 
-{EMOJI['vuln']} <b>Vulnerability:</b>
+{E_VULN} <b>Vulnerability:</b>
   <code>vuln:"CVE-2021-44228"</code> — CVE spesifik
   <code>has_vuln:true</code> — Punya vulnerability
   <code>tag:"ics"</code> — Tag ICS/SCADA
 
-{EMOJI['dns']} <b>DNS:</b>
+{E_DNS} <b>DNS:</b>
   <code>hostname:".go.id"</code> — Hostname
   <code>has_screenshot:true</code> — Ada screenshot
 
-{EMOJI['info']} <b>Others:</b>
+{E_INFO} <b>Others:</b>
   <code>before:"01/01/2024"</code> — Sebelum tanggal
   <code>after:"01/01/2024"</code> — Setelah tanggal
   <code>"keyword"</code> — Cari di banner
 
-{EMOJI['star']} <b>Kombinasi:</b>
+{E_STAR} <b>Kombinasi:</b>
   Gabungkan filter dengan spasi:
   <code>product:"nginx" country:"ID" port:443</code>
 """
+
+
+def format_welcome() -> str:
+    """Format welcome/help message."""
+    return _WELCOME_TEXT
+
+
+def format_filters_help() -> str:
+    """Format Shodan filters reference."""
+    return _FILTERS_TEXT
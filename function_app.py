@@ -4,18 +4,68 @@ Uses Azure Functions v2 Python programming model.
 """
 
 import os
-import json
+import asyncio
 import logging
+import orjson
 import azure.functions as func
-from telegram import Update
 
-from bot_app import get_application
-from config import TELEGRAM_BOT_TOKEN
+from config import TELEGRAM_BOT_TOKEN, ALLOWED_UPDATES
 
 logger = logging.getLogger(__name__)
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
+# Raw-body markers for the update types the bot handles (see ALLOWED_UPDATES)
+_RELEVANT_UPDATE_KEYS = tuple(f'"{kind}"'.encode() for kind in ALLOWED_UPDATES)
+
+# ─── Static response bodies (serialized once) ───────────────
+_JSON_HEADERS = {"content-type": "application/json"}
+_NO_WEBHOOK_URL_BODY = orjson.dumps({"error": "Cannot determine webhook URL"})
+_TEARDOWN_BODY = {
+    ok: orjson.dumps({
+        "success": ok,
+        "message": "Webhook removed. You can now use polling mode.",
+    })
+    for ok in (True, False)
+}
+
+
+def _get_bot_app():
+    """
+    Import bot_app on first use.
+    It pulls in python-telegram-bot (httpx, TLS stack), so keeping it out
+    of module import shortens worker indexing / cold start; anonymous
+    endpoints like /api/health never load it at all.
+    """
+    import bot_app
+    return bot_app
+
+
+# ─── Application warm-up ────────────────────────────────────
+# The Application is built by the first request that needs it (webhook,
+# setup, teardown) and then reused; concurrent first requests await the
+# same task instead of each building their own.
+_APP_TASK: asyncio.Future | None = None
+
+# Strong references to in-flight update tasks so they aren't GC'd mid-run
+_PENDING: set[asyncio.Task] = set()
+
+# How long the webhook waits for an update to finish before acking anyway.
+# Azure doesn't guarantee work after the invocation returns (the instance
+# may be frozen or recycled), so normal updates must finish inside it.
+UPDATE_ACK_TIMEOUT = 20.0
+
+
+def _warm_application() -> asyncio.Future:
+    """Return the (shared) task that builds and initializes the Application."""
+    global _APP_TASK
+    # A failed/cancelled warm-up is retried on the next call
+    if _APP_TASK is None or (
+        _APP_TASK.done() and (_APP_TASK.cancelled() or _APP_TASK.exception())
+    ):
+        _APP_TASK = asyncio.ensure_future(_get_bot_app().get_application())
+    return _APP_TASK
+
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  WEBHOOK ENDPOINT — Receives Telegram updates
@@ -29,25 +79,49 @@ async def telegram_webhook(req: func.HttpRequest) -> func.HttpResponse:
     Security: Bot token divalidasi oleh python-telegram-bot library.
     """
     try:
-        telegram_app = await get_application()
+        # Initialized once per worker; no per-request `async with` needed
+        telegram_app = await _warm_application()
+
+        # Drop update types we don't handle before paying for a JSON parse
+        body = req.get_body()
+        if not any(key in body for key in _RELEVANT_UPDATE_KEYS):
+            return func.HttpResponse(status_code=200)
 
-        # Parse the incoming update
-        body = req.get_body().decode("utf-8")
-        update_data = json.loads(body)
+        # Parse the incoming update straight from the raw bytes
+        update_data = orjson.loads(body)
+        from telegram import Update
         update = Update.de_json(data=update_data, bot=telegram_app.bot)
 
-        # Process the update
-        await telegram_app.process_update(update)
+        # Routed through the update processor so one user's updates stay
+        # ordered (PerUserUpdateProcessor), same as polling mode
+        task = asyncio.create_task(
+            telegram_app.update_processor.process_update(update, telegram_app.process_update(update))
+        )
+        _PENDING.add(task)
+        task.add_done_callback(_PENDING.discard)
+
+        # Wait (bounded) so a normal update completes within this
+        # invocation. A slow one keeps running after the ack, but Azure may
+        # freeze/recycle the instance then and, since Telegram was already
+        # acked, that update is lost without a retry.
+        try:
+            await asyncio.wait_for(asyncio.shield(task), UPDATE_ACK_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Update %s still running after %.0fs; acking anyway",
+                update.update_id, UPDATE_ACK_TIMEOUT,
+            )
 
         return func.HttpResponse(status_code=200)
 
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}", exc_info=True)
-        return func.HttpResponse(
-            body=json.dumps({"error": str(e)}),
-            status_code=200,  # Always return 200 to prevent Telegram retries
-            mimetype="application/json",
+        # Tracebacks are costly on a misbehaving sender; only attach at DEBUG
+        logger.error(
+            "Error processing webhook: %s", e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
         )
+        # Always return 200 to prevent Telegram retries; the body is ignored
+        return func.HttpResponse(status_code=200)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -62,7 +136,7 @@ async def setup_webhook(req: func.HttpRequest) -> func.HttpResponse:
     GET https://<your-func>.azurewebsites.net/api/setup?code=<FUNCTION_KEY>
     """
     try:
-        telegram_app = await get_application()
+        telegram_app = await _warm_application()
 
         # Auto-construct webhook URL from Azure hostname
         webhook_url = req.params.get("url", "")
@@ -73,56 +147,51 @@ async def setup_webhook(req: func.HttpRequest) -> func.HttpResponse:
 
         if not webhook_url:
             return func.HttpResponse(
-                body=json.dumps({"error": "Cannot determine webhook URL"}),
+                body=_NO_WEBHOOK_URL_BODY,
                 status_code=400,
-                mimetype="application/json",
+                headers=_JSON_HEADERS,
             )
 
-        # Set webhook
-        result = await telegram_app.bot.set_webhook(
-            url=webhook_url,
-            allowed_updates=["message", "callback_query"],
-            drop_pending_updates=True,
+        # Set webhook — skipped when Telegram already has the same one
+        # with nothing queued (re-running setup from CI/CD is common)
+        info = await telegram_app.bot.get_webhook_info()
+        webhook_unchanged = (
+            info.url == webhook_url
+            and not info.pending_update_count
+            and set(info.allowed_updates or ()) == set(ALLOWED_UPDATES)
         )
+        if webhook_unchanged:
+            result = True
+        else:
+            result = await telegram_app.bot.set_webhook(
+                url=webhook_url,
+                allowed_updates=ALLOWED_UPDATES,
+                drop_pending_updates=True,
+            )
 
-        # Set bot commands
-        from telegram import BotCommand
-        commands = [
-            BotCommand("start", "Mulai bot & tampilkan menu"),
-            BotCommand("templates", "Template pencarian siap pakai"),
-            BotCommand("t", "Shortcut untuk /templates"),
-            BotCommand("search", "Pencarian Shodan langsung"),
-            BotCommand("count", "Hitung hasil (hemat credits)"),
-            BotCommand("host", "Lookup detail IP"),
-            BotCommand("dns", "DNS resolve hostname"),
-            BotCommand("rdns", "Reverse DNS lookup"),
-            BotCommand("domain", "Info DNS domain"),
-            BotCommand("exploit", "Cari exploit"),
-            BotCommand("honeypot", "Cek honeypot score"),
-            BotCommand("scan", "Request scan IP"),
-            BotCommand("scanstatus", "Cek status scan"),
-            BotCommand("info", "Cek akun & credits"),
-            BotCommand("filters", "Referensi filter Shodan"),
-            BotCommand("help", "Tampilkan bantuan"),
-        ]
-        await telegram_app.bot.set_my_commands(commands)
+        # Set bot commands — skipped when unchanged
+        commands_changed = await _get_bot_app().sync_bot_commands(telegram_app.bot)
 
         return func.HttpResponse(
-            body=json.dumps({
+            body=orjson.dumps({
                 "success": result,
+                "unchanged": webhook_unchanged and not commands_changed,
                 "webhook_url": webhook_url,
                 "message": "Webhook registered!" if result else "Failed",
             }),
             status_code=200,
-            mimetype="application/json",
+            headers=_JSON_HEADERS,
         )
 
     except Exception as e:
-        logger.error(f"Error setting webhook: {e}", exc_info=True)
+        logger.error(
+            "Error setting webhook: %s", e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return func.HttpResponse(
-            body=json.dumps({"error": str(e)}),
+            body=orjson.dumps({"error": str(e)}),
             status_code=500,
-            mimetype="application/json",
+            headers=_JSON_HEADERS,
         )
 
 
@@ -132,26 +201,30 @@ async def setup_webhook(req: func.HttpRequest) -> func.HttpResponse:
 
 @app.route(route="health", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 async def health_check(req: func.HttpRequest) -> func.HttpResponse:
-    """Health check endpoint for monitoring."""
+    """
+    Health check endpoint for monitoring.
+    Local status only by default; add ?deep=1 to include Shodan account
+    info (cached by shodan_client.api_info so probes don't hammer Shodan).
+    """
     status = {
         "status": "healthy",
         "bot_configured": bool(TELEGRAM_BOT_TOKEN),
     }
 
-    try:
-        from shodan_client import shodan_client
-        import asyncio
-        info = await asyncio.to_thread(shodan_client.api_info)
-        status["shodan_plan"] = info.get("plan", "unknown")
-        status["query_credits"] = info.get("query_credits", 0)
-        status["scan_credits"] = info.get("scan_credits", 0)
-    except Exception as e:
-        status["shodan_error"] = str(e)
+    if req.params.get("deep") == "1":
+        try:
+            from shodan_client import shodan_client
+            info = await shodan_client.api_info()
+            status["shodan_plan"] = info.get("plan", "unknown")
+            status["query_credits"] = info.get("query_credits", 0)
+            status["scan_credits"] = info.get("scan_credits", 0)
+        except Exception as e:
+            status["shodan_error"] = str(e)
 
     return func.HttpResponse(
-        body=json.dumps(status, indent=2),
+        body=orjson.dumps(status, option=orjson.OPT_INDENT_2),
         status_code=200,
-        mimetype="application/json",
+        headers=_JSON_HEADERS,
     )
 
 
@@ -163,20 +236,17 @@ async def health_check(req: func.HttpRequest) -> func.HttpResponse:
 async def teardown_webhook(req: func.HttpRequest) -> func.HttpResponse:
     """Remove webhook (for switching back to local polling mode)."""
     try:
-        telegram_app = await get_application()
+        telegram_app = await _warm_application()
         result = await telegram_app.bot.delete_webhook(drop_pending_updates=True)
 
         return func.HttpResponse(
-            body=json.dumps({
-                "success": result,
-                "message": "Webhook removed. You can now use polling mode.",
-            }),
+            body=_TEARDOWN_BODY[bool(result)],
             status_code=200,
-            mimetype="application/json",
+            headers=_JSON_HEADERS,
         )
     except Exception as e:
         return func.HttpResponse(
-            body=json.dumps({"error": str(e)}),
+            body=orjson.dumps({"error": str(e)}),
             status_code=500,
-            mimetype="application/json",
+            headers=_JSON_HEADERS,
         )
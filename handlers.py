@@ -3,19 +3,29 @@ All Telegram bot command & callback handlers.
 Extracted from bot.py so it can be shared between polling (bot.py) and webhook (function_app.py).
 """
 
+import html
+import ipaddress
 import logging
 import asyncio
-import traceback
+import re
+from collections.abc import Iterable
 from functools import wraps
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from cachetools import TTLCache
+from telegram import Update
 from telegram.ext import (
     ConversationHandler,
     ContextTypes,
 )
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, NetworkError, RetryAfter
 
-from config import AUTHORIZED_USERS, EMOJI
+from config import (
+    AUTHORIZED_USERS,
+    E_DNS, E_DOT, E_ERROR, E_EXPLOIT, E_GEAR, E_GLOBE, E_HONEYPOT, E_HOST,
+    E_INFO, E_IP, E_RIGHT, E_SEARCH, E_STAR, E_STATS, E_SUCCESS, E_VULN,
+    E_WARNING,
+)
 from shodan_client import shodan_client
 from formatter import (
     format_search_results,
@@ -32,6 +42,8 @@ from formatter import (
     format_filters_help,
     format_facets,
     format_number,
+    iter_chunks,
+    pack_messages,
     escape_html,
     header_box,
     key_value,
@@ -43,13 +55,15 @@ from keyboards import (
     templates_in_category_keyboard,
     template_detail_keyboard,
     pagination_keyboard,
+    resolve_query_token,
     back_to_main_keyboard,
     dns_menu_keyboard,
     confirm_scan_keyboard,
+    param_default_keyboard,
+    vuln_templates_keyboard,
 )
 from templates import (
     get_template_by_id,
-    get_templates_by_category,
     search_templates,
     build_query,
     CATEGORIES,
@@ -70,31 +84,242 @@ logger = logging.getLogger(__name__)
     STATE_WAITING_COUNT_QUERY,
 ) = range(8)
 
+# Divider used in the template param prompts
+_SEP = "─" * 28
+
+# Invariant pieces of the template param prompt / progress lines
+_PARAM_PROMPT_HEAD = f"{E_GEAR} <b>Template: "
+_PARAM_PROMPT_ASK = f"{E_RIGHT} <b>Masukkan "
+_PROGRESS_DONE = f"  {E_SUCCESS} <b>"
+_PROGRESS_CURRENT = f"  {E_RIGHT} <b>"
+_PROGRESS_CURRENT_TAIL = ":</b> <i>(menunggu input...)</i>"
+_PROGRESS_TODO = f"  {E_DOT} <b>"
+_PROGRESS_TODO_TAIL = ":</b> <i>-</i>"
+
+# ─── Static prompts (rendered once) ─────────────────────────
+_WELCOME_TEXT = format_welcome()
+_FILTERS_TEXT = format_filters_help()
+_TEMPLATES_TEXT = (
+    f"{header_box('Template Pencarian', 'Pilih kategori di bawah')}\n\n"
+    f"{E_INFO} Pilih kategori untuk melihat template pencarian yang tersedia:"
+)
+_TEMPLATES_PROMPT = f"{header_box('Template Pencarian', 'Pilih kategori')}\n\n{E_INFO} Pilih kategori di bawah:"
+_HOST_PROMPT = f"{E_HOST} <b>Host Lookup</b>\n\nKirim IP address:\n<i>Contoh: 8.8.8.8</i>"
+_DNS_PROMPT = f"{E_DNS} <b>DNS Tools</b>\n\nPilih tool DNS:"
+_EXPLOIT_PROMPT = f"{E_EXPLOIT} <b>Exploit Search</b>\n\nKirim keyword:\n<i>Contoh: apache 2.4</i>"
+_VULN_PROMPT = f"{E_VULN} <b>Vulnerability Search</b>\n\nPilih template:"
+_RAW_PROMPT = (
+    f"{E_GEAR} <b>Raw Shodan Query</b>\n\n"
+    f"Kirim query Shodan langsung:\n"
+    f'<i>Contoh: product:"nginx" country:"ID" port:443</i>\n\n'
+    f"{E_INFO} Gunakan /filters untuk lihat daftar filter."
+)
+_COUNT_PROMPT = (
+    f"{E_STATS} <b>Count Query</b>\n\n"
+    f"Kirim query untuk di-count (tanpa pakai credits):\n"
+    f'<i>Contoh: country:"ID" port:22</i>'
+)
+_DNS_RESOLVE_PROMPT = f"{E_DNS} <b>DNS Resolve</b>\n\nKirim hostname:\n<i>Contoh: google.com</i>"
+_DNS_REVERSE_PROMPT = f"{E_DNS} <b>Reverse DNS</b>\n\nKirim IP address:\n<i>Contoh: 8.8.8.8</i>"
+_DNS_DOMAIN_PROMPT = f"{E_GLOBE} <b>Domain Info</b>\n\nKirim domain:\n<i>Contoh: example.com</i>"
+
+# Usage prompts for /commands sent without arguments: awaiting key → (text, state)
+_PROMPTS = {
+    "raw_query": (
+        (
+            f"{E_SEARCH} <b>Pencarian Shodan</b>\n\n"
+            f"Kirim query Shodan langsung.\n"
+            f'<i>Contoh: product:"nginx" country:"ID"</i>'
+        ),
+        STATE_WAITING_RAW_QUERY,
+    ),
+    "count_query": (
+        (
+            f"{E_STATS} <b>Count Query</b>\n\n"
+            f"Kirim query untuk di-count (tanpa pakai query credits).\n"
+            f'<i>Contoh: country:"ID" port:22</i>'
+        ),
+        STATE_WAITING_COUNT_QUERY,
+    ),
+    "host_ip": (
+        (
+            f"{E_HOST} <b>Host Lookup</b>\n\n"
+            f"Kirim IP address untuk lookup.\n<i>Contoh: 8.8.8.8</i>"
+        ),
+        STATE_WAITING_HOST_IP,
+    ),
+    "dns_resolve": (
+        (
+            f"{E_DNS} <b>DNS Resolve</b>\n\n"
+            f"Kirim hostname untuk resolve ke IP.\n<i>Contoh: google.com</i>"
+        ),
+        STATE_WAITING_DNS,
+    ),
+    "dns_reverse": (
+        (
+            f"{E_DNS} <b>Reverse DNS</b>\n\n"
+            f"Kirim IP untuk reverse DNS lookup.\n<i>Contoh: 8.8.8.8</i>"
+        ),
+        STATE_WAITING_DNS,
+    ),
+    "dns_domain": (
+        (
+            f"{E_GLOBE} <b>Domain Info</b>\n\n"
+            f"Kirim domain untuk lihat DNS records.\n<i>Contoh: example.com</i>"
+        ),
+        STATE_WAITING_DNS,
+    ),
+    "exploit_query": (
+        (
+            f"{E_EXPLOIT} <b>Exploit Search</b>\n\n"
+            f"Kirim keyword untuk cari exploit.\n<i>Contoh: apache 2.4</i>"
+        ),
+        STATE_WAITING_EXPLOIT,
+    ),
+    "honeypot_ip": (
+        (
+            f"{E_HONEYPOT} <b>Honeypot Detection</b>\n\n"
+            f"Kirim IP untuk cek honeypot score.\n<i>Contoh: 1.2.3.4</i>"
+        ),
+        STATE_WAITING_HONEYPOT_IP,
+    ),
+    "scan_ip": (
+        (
+            f"{E_IP} <b>Request Scan</b>\n\n"
+            f"Kirim IP/CIDR untuk request scan.\n<i>Contoh: 1.2.3.4</i>\n\n"
+            f"{E_WARNING} <b>Perhatian:</b> Scan menggunakan scan credits!"
+        ),
+        STATE_WAITING_SCAN_IP,
+    ),
+}
+
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  AUTH DECORATOR
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+_DENY_HEAD = f"{E_ERROR} <b>Akses ditolak.</b>\nUser ID kamu: <code>"
+_DENY_TAIL = "</code>\nHubungi admin untuk mendapatkan akses."
+
+
 def authorized(func):
-    """Restrict access to authorized users only."""
+    """
+    Restrict access to authorized users only.
+    With no AUTHORIZED_USERS configured the bot is open, so the handler is
+    returned as-is (no wrapper call per update).
+    """
+    if not AUTHORIZED_USERS:
+        return func
+
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
-        if AUTHORIZED_USERS and user_id not in AUTHORIZED_USERS:
-            msg = (
-                f"{EMOJI['error']} <b>Akses ditolak.</b>\n"
-                f"User ID kamu: <code>{user_id}</code>\n"
-                f"Hubungi admin untuk mendapatkan akses."
-            )
+        if user_id not in AUTHORIZED_USERS:
             if update.callback_query:
                 await update.callback_query.answer("⛔ Akses ditolak", show_alert=True)
             else:
-                await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+                await update.message.reply_text(
+                    f"{_DENY_HEAD}{user_id}{_DENY_TAIL}", parse_mode=ParseMode.HTML,
+                )
             return ConversationHandler.END
         return await func(update, context)
     return wrapper
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  HELPER: INPUT VALIDATION
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Malformed input is rejected locally instead of costing a Shodan
+# round-trip (and possibly a credit) just to get an error back.
+
+_HOSTNAME_RE = re.compile(
+    r"^(?=.{1,253}\.?$)(?:[A-Za-z0-9_](?:[A-Za-z0-9_-]{0,61}[A-Za-z0-9])?\.)*"
+    r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.?$",
+    re.ASCII,
+)
+
+
+def _valid_ip(text: str) -> bool:
+    """True if `text` is a single IPv4/IPv6 address."""
+    try:
+        ipaddress.ip_address(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _valid_scan_target(text: str) -> bool:
+    """True if `text` is a comma-separated list of IPs / CIDR networks."""
+    try:
+        for part in text.split(","):
+            ipaddress.ip_network(part.strip(), strict=False)
+        return True
+    except ValueError:
+        return False
+
+
+def _valid_hostname(text: str) -> bool:
+    """True if `text` looks like a DNS hostname."""
+    return _HOSTNAME_RE.match(text) is not None
+
+
+async def _reject_input(update: Update, what: str, text: str) -> int:
+    """Tell the user their input was invalid and end the conversation."""
+    await reply_html(
+        update,
+        f"{E_ERROR} <b>{what} tidak valid:</b> <code>{escape_html(text)}</code>",
+        back_to_main_keyboard(),
+    )
+    return ConversationHandler.END
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  HELPER: SHODAN CALLS
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+# In-flight lookups by key, so identical concurrent requests share one call
+_INFLIGHT: dict[object, asyncio.Future] = {}
+
+
+async def _coalesced_call(key, func, *args):
+    """
+    Run a shodan_client call once per `key` at a time; callers arriving
+    while it is in flight await the same result (or exception).
+    """
+    fut = _INFLIGHT.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(func(*args))
+        _INFLIGHT[key] = fut
+        fut.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # Shielded: one waiter being cancelled must not cancel the shared call
+    return await asyncio.shield(fut)
+
+
+# Repeated lookups within the TTL are answered from memory (no RTT, no credits)
+_DNS_CACHE = TTLCache(maxsize=1024, ttl=900)
+_HOST_CACHE = TTLCache(maxsize=4096, ttl=300)
+_COUNT_CACHE = TTLCache(maxsize=1024, ttl=300)
+
+
+async def _cached_call(cache: TTLCache, key, func, *args):
+    """
+    Await a shodan_client call, memoized by `key`.
+    Misses are coalesced; error results ({"error": ...} or a negative
+    honeypot score) are never cached.
+    """
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    result = await _coalesced_call(key, func, *args)
+    if isinstance(result, dict):
+        if "error" not in result:
+            cache[key] = result
+    elif result >= 0:
+        cache[key] = result
+    return result
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  HELPER: SEND LONG MESSAGES
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -102,31 +327,123 @@ def authorized(func):
 async def send_messages(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
-    messages: list[str],
+    messages: Iterable[str],
     reply_markup=None,
 ):
-    """Send multiple messages, attaching reply_markup to the last one."""
+    """
+    Send multiple messages, attaching reply_markup to the last one.
+    Consecutive messages are packed together up to MAX_MESSAGE_LENGTH
+    (pack_messages), so short cards share one sendMessage.
+    `messages` may be a generator: each message is sent as soon as the
+    next one has been rendered (one-item lookahead to spot the last).
+    Sends stay sequential: concurrent sends to one chat may arrive out of
+    order, and the rate limiter already paces them within flood limits.
+    """
     chat_id = update.effective_chat.id
-    for i, msg in enumerate(messages):
-        markup = reply_markup if i == len(messages) - 1 else None
+    it = pack_messages(messages)
+    msg = next(it, None)
+    while msg is not None:
+        nxt = next(it, None)
+        markup = reply_markup if nxt is None else None
+        try:
+            await _send_html(context, chat_id, msg, markup)
+        except RetryAfter as e:
+            # Rate limiter gave up after its retries — a plain-text resend
+            # would hit the same flood wait, so drop this chunk
+            logger.error(f"Flood control, message dropped: {e}")
+        except BadRequest as e:
+            logger.error(f"Error sending message: {e}")
+            # Only bad markup / oversize text can succeed as plain text;
+            # anything else would just fail again on a second round-trip
+            reason = str(e).lower()
+            if "parse" in reason or "too long" in reason:
+                await _send_plain(context, chat_id, msg, markup)
+        except NetworkError as e:
+            # Transient (timeout / connection reset): one plain retry, so the
+            # last chunk doesn't lose its text and the navigation keyboard
+            logger.warning(f"Error sending message, retrying once: {e}")
+            try:
+                await _send_html(context, chat_id, msg, markup)
+            except Exception as e:
+                logger.error(f"Retry failed, message dropped: {e}")
+        except Exception as e:
+            logger.error(f"Error sending message: {e}")
+        msg = nxt
+
+
+async def _send_html(context: ContextTypes.DEFAULT_TYPE, chat_id: int, msg: str, reply_markup=None):
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=msg,
+        parse_mode=ParseMode.HTML,
+        reply_markup=reply_markup,
+        disable_web_page_preview=True,
+    )
+
+
+# Matches HTML tags for the plain-text fallback
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+async def _send_plain(context: ContextTypes.DEFAULT_TYPE, chat_id: int, msg: str, reply_markup=None):
+    """Fallback: resend an HTML message as plain text, split if too long."""
+    plain = html.unescape(_HTML_TAG_RE.sub("", msg))
+    parts = list(iter_chunks(plain))
+    for i, part in enumerate(parts):
         try:
             await context.bot.send_message(
                 chat_id=chat_id,
-                text=msg,
-                parse_mode=ParseMode.HTML,
-                reply_markup=markup,
+                text=part,
+                reply_markup=reply_markup if i == len(parts) - 1 else None,
                 disable_web_page_preview=True,
             )
         except Exception as e:
-            logger.error(f"Error sending message: {e}")
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=msg[:4000],
-                    reply_markup=markup,
-                )
-            except Exception as e2:
-                logger.error(f"Error sending fallback message: {e2}")
+            logger.error(f"Error sending fallback message: {e}")
+            return
+
+
+# callback_data namespaces that only navigate between menus
+_NAV_PREFIXES = ("menu:", "cmd:", "cat:", "tmpl:", "dns:")
+
+
+def _is_menu_message(message) -> bool:
+    """
+    True if `message` is one of our navigation menus (every button only
+    navigates). Results, prompts and confirmations — including messages
+    whose sole button is "Menu Utama" — are never edited away.
+    """
+    markup = getattr(message, "reply_markup", None)
+    if markup is None:
+        return False
+    data = [button.callback_data for row in markup.inline_keyboard for button in row]
+    return len(data) > 1 and all(isinstance(d, str) and d.startswith(_NAV_PREFIXES) for d in data)
+
+
+async def edit_or_reply(query, text: str, reply_markup=None):
+    """
+    Show `text` in place of the clicked menu message (one editMessageText
+    instead of a new sendMessage); post a new message otherwise.
+    """
+    if _is_menu_message(query.message):
+        try:
+            await query.edit_message_text(
+                text,
+                parse_mode=ParseMode.HTML,
+                reply_markup=reply_markup,
+                disable_web_page_preview=True,
+            )
+            return
+        except BadRequest as e:
+            # Same content clicked twice — nothing to do
+            if "not modified" in str(e).lower():
+                return
+            logger.debug(f"Menu edit failed, sending new message: {e}")
+    await query.message.reply_text(
+        text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=reply_markup,
+        disable_web_page_preview=True,
+    )
 
 
 async def reply_html(update: Update, text: str, reply_markup=None):
@@ -150,29 +467,36 @@ async def reply_html(update: Update, text: str, reply_markup=None):
         logger.error(f"HTML reply error: {e}")
 
 
+async def _prompt(update: Update, context: ContextTypes.DEFAULT_TYPE, key: str, text: str | None = None) -> int:
+    """
+    Ask for input: send the prompt for `key` (or `text`), mark the user as
+    awaiting `key` and return the matching conversation state.
+    """
+    cmd_text, state = _PROMPTS[key]
+    await reply_html(update, text or cmd_text, back_to_main_keyboard())
+    context.user_data["awaiting"] = key
+    return state
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  COMMAND HANDLERS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 @authorized
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await reply_html(update, format_welcome(), main_menu_keyboard())
+    await reply_html(update, _WELCOME_TEXT, main_menu_keyboard())
     return ConversationHandler.END
 
 
 @authorized
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await reply_html(update, format_welcome(), main_menu_keyboard())
+    await reply_html(update, _WELCOME_TEXT, main_menu_keyboard())
     return ConversationHandler.END
 
 
 @authorized
 async def cmd_templates(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = (
-        f"{header_box('Template Pencarian', 'Pilih kategori di bawah')}\n\n"
-        f"{EMOJI['info']} Pilih kategori untuk melihat template pencarian yang tersedia:"
-    )
-    await reply_html(update, text, categories_keyboard())
+    await reply_html(update, _TEMPLATES_TEXT, categories_keyboard())
     return ConversationHandler.END
 
 
@@ -180,15 +504,7 @@ async def cmd_templates(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['search']} <b>Pencarian Shodan</b>\n\n"
-            f"Kirim query Shodan langsung.\n"
-            f'<i>Contoh: product:"nginx" country:"ID"</i>',
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "raw_query"
-        return STATE_WAITING_RAW_QUERY
+        return await _prompt(update, context, "raw_query")
     query = " ".join(args)
     await _execute_search(update, context, query, page=1)
     return ConversationHandler.END
@@ -198,15 +514,7 @@ async def cmd_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_count(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['stats']} <b>Count Query</b>\n\n"
-            f"Kirim query untuk di-count (tanpa pakai query credits).\n"
-            f'<i>Contoh: country:"ID" port:22</i>',
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "count_query"
-        return STATE_WAITING_COUNT_QUERY
+        return await _prompt(update, context, "count_query")
     query = " ".join(args)
     await _execute_count(update, context, query)
     return ConversationHandler.END
@@ -216,14 +524,7 @@ async def cmd_count(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_host(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['host']} <b>Host Lookup</b>\n\n"
-            f"Kirim IP address untuk lookup.\n<i>Contoh: 8.8.8.8</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "host_ip"
-        return STATE_WAITING_HOST_IP
+        return await _prompt(update, context, "host_ip")
     await _execute_host(update, context, args[0])
     return ConversationHandler.END
 
@@ -232,103 +533,52 @@ async def cmd_host(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_dns(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['dns']} <b>DNS Resolve</b>\n\n"
-            f"Kirim hostname untuk resolve ke IP.\n<i>Contoh: google.com</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "dns_resolve"
-        return STATE_WAITING_DNS
-    data = shodan_client.dns_resolve([args[0]])
-    await reply_html(update, format_dns_resolve(data), back_to_main_keyboard())
-    return ConversationHandler.END
+        return await _prompt(update, context, "dns_resolve")
+    return await _run_lookup(update, context, "dns_resolve", args[0])
 
 
 @authorized
 async def cmd_rdns(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['dns']} <b>Reverse DNS</b>\n\n"
-            f"Kirim IP untuk reverse DNS lookup.\n<i>Contoh: 8.8.8.8</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "dns_reverse"
-        return STATE_WAITING_DNS
-    data = shodan_client.dns_reverse([args[0]])
-    await reply_html(update, format_dns_reverse(data), back_to_main_keyboard())
-    return ConversationHandler.END
+        return await _prompt(update, context, "dns_reverse")
+    return await _run_lookup(update, context, "dns_reverse", args[0])
 
 
 @authorized
 async def cmd_domain(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['globe']} <b>Domain Info</b>\n\n"
-            f"Kirim domain untuk lihat DNS records.\n<i>Contoh: example.com</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "dns_domain"
-        return STATE_WAITING_DNS
-    data = shodan_client.dns_domain(args[0])
-    await reply_html(update, format_domain_info(data), back_to_main_keyboard())
-    return ConversationHandler.END
+        return await _prompt(update, context, "dns_domain")
+    return await _run_lookup(update, context, "dns_domain", args[0])
 
 
 @authorized
 async def cmd_exploit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['exploit']} <b>Exploit Search</b>\n\n"
-            f"Kirim keyword untuk cari exploit.\n<i>Contoh: apache 2.4</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "exploit_query"
-        return STATE_WAITING_EXPLOIT
-    data = shodan_client.search_exploits(" ".join(args))
-    await send_messages(update, context, format_exploits(data), back_to_main_keyboard())
-    return ConversationHandler.END
+        return await _prompt(update, context, "exploit_query")
+    return await _run_lookup(update, context, "exploit_query", " ".join(args))
 
 
 @authorized
 async def cmd_honeypot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['honeypot']} <b>Honeypot Detection</b>\n\n"
-            f"Kirim IP untuk cek honeypot score.\n<i>Contoh: 1.2.3.4</i>",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "honeypot_ip"
-        return STATE_WAITING_HONEYPOT_IP
-    score = shodan_client.honeypot_score(args[0])
-    await reply_html(update, format_honeypot_score(args[0], score), back_to_main_keyboard())
-    return ConversationHandler.END
+        return await _prompt(update, context, "honeypot_ip")
+    return await _run_lookup(update, context, "honeypot_ip", args[0])
 
 
 @authorized
 async def cmd_scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await reply_html(
-            update,
-            f"{EMOJI['ip']} <b>Request Scan</b>\n\n"
-            f"Kirim IP/CIDR untuk request scan.\n<i>Contoh: 1.2.3.4</i>\n\n"
-            f"{EMOJI['warning']} <b>Perhatian:</b> Scan menggunakan scan credits!",
-            back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "scan_ip"
-        return STATE_WAITING_SCAN_IP
+        return await _prompt(update, context, "scan_ip")
     ip = args[0]
+    if not _valid_scan_target(ip):
+        return await _reject_input(update, "IP/CIDR", ip)
     text = (
-        f"{EMOJI['warning']} <b>Konfirmasi Scan</b>\n\n"
+        f"{E_WARNING} <b>Konfirmasi Scan</b>\n\n"
         f"Apakah kamu yakin ingin scan <code>{escape_html(ip)}</code>?\n"
         f"Ini akan menggunakan scan credits."
     )
@@ -342,26 +592,30 @@ async def cmd_scanstatus(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not args:
         await reply_html(
             update,
-            f"{EMOJI['info']} <b>Scan Status</b>\n\n"
+            f"{E_INFO} <b>Scan Status</b>\n\n"
             f"Kirim scan ID untuk cek status.\n<i>Contoh: /scanstatus abc123</i>",
             back_to_main_keyboard(),
         )
         return ConversationHandler.END
-    data = shodan_client.scan_status(args[0])
-    await reply_html(update, format_scan_status(data), back_to_main_keyboard())
+    try:
+        data = await shodan_client.scan_status(args[0])
+        await reply_html(update, format_scan_status(data), back_to_main_keyboard())
+    except Exception as e:
+        logger.error(f"Scan status error: {e}")
+        await reply_html(update, f"{E_ERROR} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
     return ConversationHandler.END
 
 
 @authorized
 async def cmd_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        info = await asyncio.to_thread(shodan_client.api_info)
+        info = await shodan_client.api_info()
         await reply_html(update, format_api_info(info), back_to_main_keyboard())
     except Exception as e:
         logger.error(f"Info error: {e}")
         await reply_html(
             update,
-            f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}",
+            f"{E_ERROR} <b>Error:</b> {escape_html(str(e))}",
             back_to_main_keyboard(),
         )
     return ConversationHandler.END
@@ -369,256 +623,304 @@ async def cmd_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @authorized
 async def cmd_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await reply_html(update, format_filters_help(), back_to_main_keyboard())
+    await reply_html(update, _FILTERS_TEXT, back_to_main_keyboard())
     return ConversationHandler.END
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  COMMAND DISPATCH TABLE
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+COMMAND_MAP = {
+    "templates": cmd_templates,
+    "t": cmd_templates,
+    "search": cmd_search,
+    "count": cmd_count,
+    "host": cmd_host,
+    "dns": cmd_dns,
+    "rdns": cmd_rdns,
+    "domain": cmd_domain,
+    "exploit": cmd_exploit,
+    "honeypot": cmd_honeypot,
+    "scan": cmd_scan,
+    "scanstatus": cmd_scanstatus,
+    "info": cmd_info,
+    "filters": cmd_filters,
+}
+
+
+async def dispatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a /command to its handler with a single dict lookup."""
+    words = update.effective_message.text.split()
+    command, _, target = words[0][1:].partition("@")
+    # Like CommandHandler: /cmd@OtherBot in a group is not for us
+    if target and target.lower() != context.bot.username.lower():
+        return None
+    handler = COMMAND_MAP.get(command.lower())
+    if handler is None:
+        return None
+    # MessageHandler doesn't fill context.args like CommandHandler does
+    context.args = words[1:]
+    return await handler(update, context)
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  CALLBACK QUERY HANDLER
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-@authorized
-async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle all inline keyboard callbacks."""
-    query = update.callback_query
-    await query.answer()
-    data = query.data
+# Each callback route takes (update, context, query, arg); `arg` is the
+# part of callback_data after the prefix ("" for exact routes).
 
-    # ─── Navigation ─────────────────────────────────────────
-    if data == "menu:main":
-        await query.message.reply_text(
-            format_welcome(),
-            parse_mode=ParseMode.HTML,
-            reply_markup=main_menu_keyboard(),
-            disable_web_page_preview=True,
-        )
-        return ConversationHandler.END
+# ─── Navigation ─────────────────────────────────────────────
 
-    if data == "menu:templates":
-        text = f"{header_box('Template Pencarian', 'Pilih kategori')}\n\n{EMOJI['info']} Pilih kategori di bawah:"
-        await query.message.reply_text(
-            text, parse_mode=ParseMode.HTML, reply_markup=categories_keyboard(),
-        )
-        return ConversationHandler.END
+async def _cb_menu_main(update, context, query, arg):
+    await edit_or_reply(query, _WELCOME_TEXT, main_menu_keyboard())
+    return ConversationHandler.END
 
-    if data == "menu:host":
-        await query.message.reply_text(
-            f"{EMOJI['host']} <b>Host Lookup</b>\n\nKirim IP address:\n<i>Contoh: 8.8.8.8</i>",
-            parse_mode=ParseMode.HTML,
-            reply_markup=back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "host_ip"
-        return STATE_WAITING_HOST_IP
 
-    if data == "menu:dns":
-        await query.message.reply_text(
-            f"{EMOJI['dns']} <b>DNS Tools</b>\n\nPilih tool DNS:",
-            parse_mode=ParseMode.HTML,
-            reply_markup=dns_menu_keyboard(),
-        )
-        return ConversationHandler.END
+async def _cb_menu_templates(update, context, query, arg):
+    await edit_or_reply(query, _TEMPLATES_PROMPT, categories_keyboard())
+    return ConversationHandler.END
 
-    if data == "menu:exploits":
-        await query.message.reply_text(
-            f"{EMOJI['exploit']} <b>Exploit Search</b>\n\nKirim keyword:\n<i>Contoh: apache 2.4</i>",
-            parse_mode=ParseMode.HTML,
-            reply_markup=back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "exploit_query"
-        return STATE_WAITING_EXPLOIT
-
-    if data == "menu:vuln":
-        vuln_templates = get_templates_by_category("vuln")
-        buttons = []
-        for t in vuln_templates:
-            buttons.append([
-                InlineKeyboardButton(f"{t.emoji} {t.name}", callback_data=f"tmpl:{t.id}")
-            ])
-        buttons.append([InlineKeyboardButton("🔙 Kembali", callback_data="menu:main")])
-        await query.message.reply_text(
-            f"{EMOJI['vuln']} <b>Vulnerability Search</b>\n\nPilih template:",
-            parse_mode=ParseMode.HTML,
-            reply_markup=InlineKeyboardMarkup(buttons),
-        )
-        return ConversationHandler.END
 
-    if data == "menu:raw":
-        await query.message.reply_text(
-            f"{EMOJI['gear']} <b>Raw Shodan Query</b>\n\n"
-            f"Kirim query Shodan langsung:\n"
-            f'<i>Contoh: product:"nginx" country:"ID" port:443</i>\n\n'
-            f"{EMOJI['info']} Gunakan /filters untuk lihat daftar filter.",
-            parse_mode=ParseMode.HTML,
-            reply_markup=back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "raw_query"
-        return STATE_WAITING_RAW_QUERY
+async def _cb_menu_host(update, context, query, arg):
+    return await _prompt(update, context, "host_ip", _HOST_PROMPT)
 
-    if data == "menu:count":
-        await query.message.reply_text(
-            f"{EMOJI['stats']} <b>Count Query</b>\n\n"
-            f"Kirim query untuk di-count (tanpa pakai credits):\n"
-            f'<i>Contoh: country:"ID" port:22</i>',
-            parse_mode=ParseMode.HTML,
-            reply_markup=back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "count_query"
-        return STATE_WAITING_COUNT_QUERY
 
-    # ─── Commands via callback ──────────────────────────────
-    if data == "cmd:info":
-        try:
-            info = await asyncio.to_thread(shodan_client.api_info)
-            await query.message.reply_text(
-                format_api_info(info),
-                parse_mode=ParseMode.HTML,
-                reply_markup=back_to_main_keyboard(),
-            )
-        except Exception as e:
-            logger.error(f"Info callback error: {e}")
-            await query.message.reply_text(
-                f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}",
-                parse_mode=ParseMode.HTML,
-                reply_markup=back_to_main_keyboard(),
-            )
-        return ConversationHandler.END
+async def _cb_menu_dns(update, context, query, arg):
+    await edit_or_reply(query, _DNS_PROMPT, dns_menu_keyboard())
+    return ConversationHandler.END
+
+
+async def _cb_menu_exploits(update, context, query, arg):
+    return await _prompt(update, context, "exploit_query", _EXPLOIT_PROMPT)
+
+
+async def _cb_menu_vuln(update, context, query, arg):
+    await edit_or_reply(query, _VULN_PROMPT, vuln_templates_keyboard())
+    return ConversationHandler.END
+
+
+async def _cb_menu_raw(update, context, query, arg):
+    return await _prompt(update, context, "raw_query", _RAW_PROMPT)
 
-    if data == "cmd:filters":
+
+async def _cb_menu_count(update, context, query, arg):
+    return await _prompt(update, context, "count_query", _COUNT_PROMPT)
+
+
+# ─── Commands via callback ──────────────────────────────────
+
+async def _cb_info(update, context, query, arg):
+    try:
+        info = await shodan_client.api_info()
+        await edit_or_reply(query, format_api_info(info), back_to_main_keyboard())
+    except Exception as e:
+        logger.error(f"Info callback error: {e}")
         await query.message.reply_text(
-            format_filters_help(),
+            f"{E_ERROR} <b>Error:</b> {escape_html(str(e))}",
             parse_mode=ParseMode.HTML,
             reply_markup=back_to_main_keyboard(),
-            disable_web_page_preview=True,
         )
-        return ConversationHandler.END
+    return ConversationHandler.END
 
-    if data == "cmd:help":
-        await query.message.reply_text(
-            format_welcome(),
-            parse_mode=ParseMode.HTML,
-            reply_markup=main_menu_keyboard(),
-            disable_web_page_preview=True,
-        )
+
+async def _cb_filters(update, context, query, arg):
+    await edit_or_reply(query, _FILTERS_TEXT, back_to_main_keyboard())
+    return ConversationHandler.END
+
+
+# ─── DNS callbacks ──────────────────────────────────────────
+
+async def _cb_dns_resolve(update, context, query, arg):
+    return await _prompt(update, context, "dns_resolve", _DNS_RESOLVE_PROMPT)
+
+
+async def _cb_dns_reverse(update, context, query, arg):
+    return await _prompt(update, context, "dns_reverse", _DNS_REVERSE_PROMPT)
+
+
+async def _cb_dns_domain(update, context, query, arg):
+    return await _prompt(update, context, "dns_domain", _DNS_DOMAIN_PROMPT)
+
+
+async def _cb_noop(update, context, query, arg):
+    return ConversationHandler.END
+
+
+# ─── Category selection ─────────────────────────────────────
+
+async def _cb_category(update, context, query, cat_id):
+    cat_info = CATEGORIES.get(cat_id, {"name": cat_id})
+    text = f"{E_SEARCH} <b>{escape_html(cat_info['name'])}</b>\n\nPilih template:"
+    await edit_or_reply(query, text, templates_in_category_keyboard(cat_id))
+    return ConversationHandler.END
+
+
+# ─── Template detail ────────────────────────────────────────
+
+async def _cb_template(update, context, query, tmpl_id):
+    tmpl = get_template_by_id(tmpl_id)
+    if not tmpl:
+        await query.message.reply_text(f"{E_ERROR} Template tidak ditemukan.")
         return ConversationHandler.END
+    await query.message.reply_text(
+        format_template_detail(tmpl),
+        parse_mode=ParseMode.HTML,
+        reply_markup=template_detail_keyboard(tmpl),
+    )
+    return ConversationHandler.END
 
-    # ─── Category selection ─────────────────────────────────
-    if data.startswith("cat:"):
-        cat_id = data[4:]
-        cat_info = CATEGORIES.get(cat_id, {"name": cat_id})
-        text = f"{EMOJI['search']} <b>{escape_html(cat_info['name'])}</b>\n\nPilih template:"
-        await query.message.reply_text(
-            text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=templates_in_category_keyboard(cat_id),
-        )
+
+# ─── Use template ───────────────────────────────────────────
+
+async def _cb_use_template(update, context, query, tmpl_id):
+    tmpl = get_template_by_id(tmpl_id)
+    if not tmpl:
+        await query.message.reply_text(f"{E_ERROR} Template tidak ditemukan.")
         return ConversationHandler.END
+    context.user_data["current_template"] = tmpl_id
+    context.user_data["template_values"] = {}
+    context.user_data["param_index"] = 0
+    return await _ask_next_param(update, context)
 
-    # ─── Template detail ────────────────────────────────────
-    if data.startswith("tmpl:"):
-        tmpl_id = data[5:]
-        tmpl = get_template_by_id(tmpl_id)
-        if not tmpl:
-            await query.message.reply_text(f"{EMOJI['error']} Template tidak ditemukan.")
-            return ConversationHandler.END
-        await query.message.reply_text(
-            format_template_detail(tmpl),
-            parse_mode=ParseMode.HTML,
-            reply_markup=template_detail_keyboard(tmpl),
-        )
+
+# ─── Run example ────────────────────────────────────────────
+
+async def _cb_example(update, context, query, tmpl_id):
+    tmpl = get_template_by_id(tmpl_id)
+    if not tmpl:
+        await query.message.reply_text(f"{E_ERROR} Template tidak ditemukan.")
         return ConversationHandler.END
+    await _execute_search(
+        update, context, tmpl.example, page=1, facets=tmpl.facets,
+        status=f"⏳ <i>Menjalankan: <code>{escape_html(tmpl.example)}</code></i>",
+    )
+    return ConversationHandler.END
 
-    # ─── Use template ───────────────────────────────────────
-    if data.startswith("use:"):
-        tmpl_id = data[4:]
-        tmpl = get_template_by_id(tmpl_id)
-        if not tmpl:
-            await query.message.reply_text(f"{EMOJI['error']} Template tidak ditemukan.")
-            return ConversationHandler.END
-        context.user_data["current_template"] = tmpl_id
-        context.user_data["template_values"] = {}
-        context.user_data["param_index"] = 0
-        return await _ask_next_param(update, context)
 
-    # ─── Run example ────────────────────────────────────────
-    if data.startswith("example:"):
-        tmpl_id = data[8:]
-        tmpl = get_template_by_id(tmpl_id)
-        if not tmpl:
-            await query.message.reply_text(f"{EMOJI['error']} Template tidak ditemukan.")
-            return ConversationHandler.END
-        await query.message.reply_text(
-            f"⏳ <i>Menjalankan: <code>{escape_html(tmpl.example)}</code></i>",
-            parse_mode=ParseMode.HTML,
+# ─── Pagination ─────────────────────────────────────────────
+
+async def _cb_page(update, context, query, arg):
+    # "<n>:<query>" inline, or "t<n>:<token>" for queries too long for it
+    page, sep, search_query = arg.partition(":")
+    if not sep:
+        return ConversationHandler.END
+    if page.startswith("t"):
+        page, search_query = page[1:], resolve_query_token(search_query)
+    if not page.isdigit():
+        return ConversationHandler.END
+    if search_query is None:
+        await reply_html(
+            update,
+            f"{E_WARNING} <i>Halaman ini sudah kedaluwarsa, silakan ulangi pencarian.</i>",
+            back_to_main_keyboard(),
         )
-        await _execute_search(update, context, tmpl.example, page=1, facets=tmpl.facets)
         return ConversationHandler.END
+    await _execute_search(update, context, search_query, page=int(page))
+    return ConversationHandler.END
 
-    # ─── Pagination ─────────────────────────────────────────
-    if data.startswith("page:"):
-        parts = data.split(":", 2)
-        if len(parts) == 3:
-            page = int(parts[1])
-            search_query = parts[2]
-            await _execute_search(update, context, search_query, page=page)
-        return ConversationHandler.END
 
-    # ─── DNS callbacks ──────────────────────────────────────
-    if data == "dns:resolve":
-        await query.message.reply_text(
-            f"{EMOJI['dns']} <b>DNS Resolve</b>\n\nKirim hostname:\n<i>Contoh: google.com</i>",
-            parse_mode=ParseMode.HTML,
-            reply_markup=back_to_main_keyboard(),
-        )
-        context.user_data["awaiting"] = "dns_resolve"
-        return STATE_WAITING_DNS
+# ─── Scan confirm ───────────────────────────────────────────
 
-    if data == "dns:reverse":
+async def _cb_doscan(update, context, query, ip):
+    # callback_data can be forged by the client, so check again
+    if not _valid_scan_target(ip):
+        return await _reject_input(update, "IP/CIDR", ip)
+    try:
+        result = await shodan_client.scan_ip(ip)
         await query.message.reply_text(
-            f"{EMOJI['dns']} <b>Reverse DNS</b>\n\nKirim IP address:\n<i>Contoh: 8.8.8.8</i>",
+            format_scan_result(result),
             parse_mode=ParseMode.HTML,
             reply_markup=back_to_main_keyboard(),
         )
-        context.user_data["awaiting"] = "dns_reverse"
-        return STATE_WAITING_DNS
-
-    if data == "dns:domain":
+    except Exception as e:
+        logger.error(f"Scan callback error: {e}")
         await query.message.reply_text(
-            f"{EMOJI['globe']} <b>Domain Info</b>\n\nKirim domain:\n<i>Contoh: example.com</i>",
+            f"{E_ERROR} <b>Error saat scan:</b> {escape_html(str(e))}",
             parse_mode=ParseMode.HTML,
             reply_markup=back_to_main_keyboard(),
         )
-        context.user_data["awaiting"] = "dns_domain"
-        return STATE_WAITING_DNS
+    return ConversationHandler.END
 
-    # ─── Scan confirm ───────────────────────────────────────
-    if data.startswith("doscan:"):
-        ip = data[7:]
-        try:
-            result = await asyncio.to_thread(shodan_client.scan_ip, ip)
-            await query.message.reply_text(
-                format_scan_result(result),
-                parse_mode=ParseMode.HTML,
-                reply_markup=back_to_main_keyboard(),
-            )
-        except Exception as e:
-            logger.error(f"Scan callback error: {e}")
-            await query.message.reply_text(
-                f"{EMOJI['error']} <b>Error saat scan:</b> {escape_html(str(e))}",
-                parse_mode=ParseMode.HTML,
-                reply_markup=back_to_main_keyboard(),
-            )
-        return ConversationHandler.END
 
-    if data == "noop":
-        return ConversationHandler.END
+# Fixed callback_data values
+CALLBACK_MAP = {
+    "menu:main": _cb_menu_main,
+    "menu:templates": _cb_menu_templates,
+    "menu:host": _cb_menu_host,
+    "menu:dns": _cb_menu_dns,
+    "menu:exploits": _cb_menu_exploits,
+    "menu:vuln": _cb_menu_vuln,
+    "menu:raw": _cb_menu_raw,
+    "menu:count": _cb_menu_count,
+    "cmd:info": _cb_info,
+    "cmd:filters": _cb_filters,
+    "cmd:help": _cb_menu_main,
+    "dns:resolve": _cb_dns_resolve,
+    "dns:reverse": _cb_dns_reverse,
+    "dns:domain": _cb_dns_domain,
+    "noop": _cb_noop,
+}
+
+# "<prefix>:<arg>" callback_data, keyed by prefix
+CALLBACK_PREFIX_MAP = {
+    "cat": _cb_category,
+    "tmpl": _cb_template,
+    "use": _cb_use_template,
+    "example": _cb_example,
+    "page": _cb_page,
+    "doscan": _cb_doscan,
+}
 
-    return ConversationHandler.END
+
+@authorized
+async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle all inline keyboard callbacks via CALLBACK_MAP / CALLBACK_PREFIX_MAP."""
+    query = update.callback_query
+    # Ack concurrently with the reply instead of paying its RTT up front
+    ack = asyncio.create_task(query.answer())
+    data = query.data
+    try:
+        handler = CALLBACK_MAP.get(data)
+        if handler is not None:
+            return await handler(update, context, query, "")
+
+        prefix, _, arg = data.partition(":")
+        handler = CALLBACK_PREFIX_MAP.get(prefix)
+        if handler is not None:
+            return await handler(update, context, query, arg)
+
+        return ConversationHandler.END
+    finally:
+        try:
+            await ack
+        except Exception as e:
+            logger.debug(f"Callback answer failed: {e}")
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  TEMPLATE PARAM FLOW
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+# (template id, param index) → (head, ask) prompt fragments; templates are
+# static, so their fields are escaped once instead of on every prompt
+_PARAM_PROMPT_CACHE: dict[tuple[str, int], tuple[str, str]] = {}
+
+
+def _param_prompt_parts(tmpl: SearchTemplate, idx: int) -> tuple[str, str]:
+    parts = _PARAM_PROMPT_CACHE.get((tmpl.id, idx))
+    if parts is None:
+        param = tmpl.params[idx]
+        parts = _PARAM_PROMPT_CACHE[(tmpl.id, idx)] = (
+            f"{_PARAM_PROMPT_HEAD}{escape_html(tmpl.name)}</b>\n{_SEP}\n",
+            f"{_SEP}\n"
+            f"{_PARAM_PROMPT_ASK}{escape_html(param.description)}:</b>\n"
+            f"<i>Contoh: <code>{escape_html(param.placeholder)}</code></i>",
+        )
+    return parts
+
+
 async def _ask_next_param(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Ask user for the next template parameter."""
     tmpl_id = context.user_data.get("current_template")
@@ -631,12 +933,10 @@ async def _ask_next_param(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if idx >= len(tmpl.params):
         query = build_query(tmpl, values)
-        msg_target = update.callback_query.message if update.callback_query else update.message
-        await msg_target.reply_text(
-            f"⏳ <i>Menjalankan: <code>{escape_html(query)}</code></i>",
-            parse_mode=ParseMode.HTML,
+        await _execute_search(
+            update, context, query, page=1, facets=tmpl.facets,
+            status=f"⏳ <i>Menjalankan: <code>{escape_html(query)}</code></i>",
         )
-        await _execute_search(update, context, query, page=1, facets=tmpl.facets)
         context.user_data.pop("current_template", None)
         context.user_data.pop("template_values", None)
         context.user_data.pop("param_index", None)
@@ -644,40 +944,24 @@ async def _ask_next_param(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     param = tmpl.params[idx]
 
-    progress_parts = []
-    for i, p in enumerate(tmpl.params):
-        if i < idx:
-            val = values.get(p.name, "?")
-            progress_parts.append(
-                f"  {EMOJI['success']} <b>{p.name}:</b> <code>{escape_html(val)}</code>"
-            )
-        elif i == idx:
-            progress_parts.append(
-                f"  {EMOJI['right']} <b>{p.name}:</b> <i>(menunggu input...)</i>"
-            )
-        else:
-            progress_parts.append(f"  {EMOJI['dot']} <b>{p.name}:</b> <i>-</i>")
-
-    text = (
-        f"{EMOJI['gear']} <b>Template: {escape_html(tmpl.name)}</b>\n"
-        f"{'─' * 28}\n"
-        f"\n<b>Progress:</b>\n" + "\n".join(progress_parts) + "\n\n"
-        f"{'─' * 28}\n"
-        f"{EMOJI['right']} <b>Masukkan {escape_html(param.description)}:</b>\n"
-        f"<i>Contoh: <code>{escape_html(param.placeholder)}</code></i>"
+    progress_parts = [
+        f"{_PROGRESS_DONE}{p.name}:</b> <code>{escape_html(values.get(p.name, '?'))}</code>"
+        for p in tmpl.params[:idx]
+    ]
+    progress_parts.append(f"{_PROGRESS_CURRENT}{param.name}{_PROGRESS_CURRENT_TAIL}")
+    progress_parts.extend(
+        f"{_PROGRESS_TODO}{p.name}{_PROGRESS_TODO_TAIL}" for p in tmpl.params[idx + 1:]
     )
 
+    progress = "\n".join(progress_parts)
+    head, ask = _param_prompt_parts(tmpl, idx)
+    text = f"{head}\n<b>Progress:</b>\n{progress}\n\n{ask}"
+
     msg_target = update.callback_query.message if update.callback_query else update.message
     await msg_target.reply_text(
         text,
         parse_mode=ParseMode.HTML,
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton(
-                f"💡 Pakai default: {param.placeholder}",
-                callback_data=f"default:{param.name}:{param.placeholder}",
-            )],
-            [InlineKeyboardButton("❌ Batal", callback_data="menu:main")],
-        ]),
+        reply_markup=param_default_keyboard(param.name, param.placeholder),
     )
     context.user_data["awaiting"] = "template_param"
     return STATE_WAITING_PARAM
@@ -687,111 +971,56 @@ async def _ask_next_param(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def handle_param_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle parameter text input from user."""
     awaiting = context.user_data.get("awaiting", "")
+    text = update.message.text.strip()
+
+    if awaiting in _LOOKUPS:
+        context.user_data.pop("awaiting", None)
+        return await _run_lookup(update, context, awaiting, text)
 
     if awaiting == "template_param":
-        value = update.message.text.strip()
         tmpl_id = context.user_data.get("current_template")
         tmpl = get_template_by_id(tmpl_id)
         if not tmpl:
             return ConversationHandler.END
         idx = context.user_data.get("param_index", 0)
         param = tmpl.params[idx]
-        context.user_data["template_values"][param.name] = value
+        context.user_data["template_values"][param.name] = text
         context.user_data["param_index"] = idx + 1
         return await _ask_next_param(update, context)
 
     elif awaiting == "raw_query":
-        query = update.message.text.strip()
         context.user_data.pop("awaiting", None)
-        await update.message.reply_text(
-            f"⏳ <i>Mencari: <code>{escape_html(query)}</code></i>",
-            parse_mode=ParseMode.HTML,
+        await _execute_search(
+            update, context, text, page=1,
+            status=f"⏳ <i>Mencari: <code>{escape_html(text)}</code></i>",
         )
-        await _execute_search(update, context, query, page=1)
         return ConversationHandler.END
 
     elif awaiting == "count_query":
-        query = update.message.text.strip()
         context.user_data.pop("awaiting", None)
-        await _execute_count(update, context, query)
+        await _execute_count(update, context, text)
         return ConversationHandler.END
 
     elif awaiting == "host_ip":
-        ip = update.message.text.strip()
-        context.user_data.pop("awaiting", None)
-        await _execute_host(update, context, ip)
-        return ConversationHandler.END
-
-    elif awaiting == "dns_resolve":
-        hostname = update.message.text.strip()
-        context.user_data.pop("awaiting", None)
-        try:
-            data = await asyncio.to_thread(shodan_client.dns_resolve, [hostname])
-            await reply_html(update, format_dns_resolve(data), back_to_main_keyboard())
-        except Exception as e:
-            logger.error(f"DNS resolve error: {e}")
-            await reply_html(update, f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
-        return ConversationHandler.END
-
-    elif awaiting == "dns_reverse":
-        ip = update.message.text.strip()
-        context.user_data.pop("awaiting", None)
-        try:
-            data = await asyncio.to_thread(shodan_client.dns_reverse, [ip])
-            await reply_html(update, format_dns_reverse(data), back_to_main_keyboard())
-        except Exception as e:
-            logger.error(f"DNS reverse error: {e}")
-            await reply_html(update, f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
-        return ConversationHandler.END
-
-    elif awaiting == "dns_domain":
-        domain = update.message.text.strip()
         context.user_data.pop("awaiting", None)
-        try:
-            data = await asyncio.to_thread(shodan_client.dns_domain, domain)
-            await reply_html(update, format_domain_info(data), back_to_main_keyboard())
-        except Exception as e:
-            logger.error(f"DNS domain error: {e}")
-            await reply_html(update, f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
-        return ConversationHandler.END
-
-    elif awaiting == "exploit_query":
-        query = update.message.text.strip()
-        context.user_data.pop("awaiting", None)
-        try:
-            data = await asyncio.to_thread(shodan_client.search_exploits, query)
-            await send_messages(update, context, format_exploits(data), back_to_main_keyboard())
-        except Exception as e:
-            logger.error(f"Exploit search error: {e}")
-            await reply_html(update, f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
-        return ConversationHandler.END
-
-    elif awaiting == "honeypot_ip":
-        ip = update.message.text.strip()
-        context.user_data.pop("awaiting", None)
-        try:
-            score = await asyncio.to_thread(shodan_client.honeypot_score, ip)
-            await reply_html(update, format_honeypot_score(ip, score), back_to_main_keyboard())
-        except Exception as e:
-            logger.error(f"Honeypot score error: {e}")
-            await reply_html(update, f"{EMOJI['error']} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
+        await _execute_host(update, context, text)
         return ConversationHandler.END
 
     elif awaiting == "scan_ip":
-        ip = update.message.text.strip()
         context.user_data.pop("awaiting", None)
-        text = (
-            f"{EMOJI['warning']} <b>Konfirmasi Scan</b>\n\n"
-            f"Scan <code>{escape_html(ip)}</code>?\nIni menggunakan scan credits."
+        if not _valid_scan_target(text):
+            return await _reject_input(update, "IP/CIDR", text)
+        confirm = (
+            f"{E_WARNING} <b>Konfirmasi Scan</b>\n\n"
+            f"Scan <code>{escape_html(text)}</code>?\nIni menggunakan scan credits."
         )
-        await reply_html(update, text, confirm_scan_keyboard(ip))
+        await reply_html(update, confirm, confirm_scan_keyboard(text))
         return ConversationHandler.END
 
     # Default: raw search
-    query = update.message.text.strip()
-    if query.startswith("/"):
+    if text.startswith("/"):
         return ConversationHandler.END
-    await _execute_search(update, context, query, page=1)
+    await _execute_search(update, context, text, page=1)
     return ConversationHandler.END
 
 
@@ -805,15 +1034,13 @@ async def handle_default_param(update: Update, context: ContextTypes.DEFAULT_TYP
     if data.startswith("default:"):
         parts = data.split(":", 2)
         if len(parts) == 3:
-            param_name = parts[1]
-            param_value = parts[2]
-            tmpl_id = context.user_data.get("current_template")
-            tmpl = get_template_by_id(tmpl_id)
+            _, param_name, param_value = parts
+            user_data = context.user_data
+            tmpl = get_template_by_id(user_data.get("current_template"))
             if not tmpl:
                 return ConversationHandler.END
-            context.user_data["template_values"][param_name] = param_value
-            idx = context.user_data.get("param_index", 0)
-            context.user_data["param_index"] = idx + 1
+            user_data["template_values"][param_name] = param_value
+            user_data["param_index"] = user_data.get("param_index", 0) + 1
             return await _ask_next_param(update, context)
 
     return ConversationHandler.END
@@ -823,19 +1050,86 @@ async def handle_default_param(update: Update, context: ContextTypes.DEFAULT_TYP
 #  EXECUTION HELPERS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+# Single-call lookups shared by /commands and typed input:
+# awaiting key → (log label, cache, cache tag, shodan call, call args, renderer)
+_LOOKUPS = {
+    "dns_resolve": (
+        "DNS resolve", _DNS_CACHE, "resolve", shodan_client.dns_resolve,
+        lambda text: ([text],), lambda text, data: format_dns_resolve(data),
+    ),
+    "dns_reverse": (
+        "DNS reverse", _DNS_CACHE, "reverse", shodan_client.dns_reverse,
+        lambda text: ([text],), lambda text, data: format_dns_reverse(data),
+    ),
+    "dns_domain": (
+        "DNS domain", _DNS_CACHE, "domain", shodan_client.dns_domain,
+        lambda text: (text,), lambda text, data: format_domain_info(data),
+    ),
+    "exploit_query": (
+        "Exploit search", _HOST_CACHE, "exploit", shodan_client.search_exploits,
+        lambda text: (text,), lambda text, data: format_exploits(data),
+    ),
+    "honeypot_ip": (
+        "Honeypot score", _HOST_CACHE, "honeypot", shodan_client.honeypot_score,
+        lambda text: (text,), format_honeypot_score,
+    ),
+}
+
+# Facets shown with /count results
+_COUNT_FACETS = "org:10,port:10,country:10"
+
+# Local input checks per lookup: key → (validator, label for the error)
+_LOOKUP_VALIDATORS = {
+    "dns_resolve": (_valid_hostname, "Hostname"),
+    "dns_reverse": (_valid_ip, "IP"),
+    "dns_domain": (_valid_hostname, "Domain"),
+    "honeypot_ip": (_valid_ip, "IP"),
+}
+
+
+async def _run_lookup(update: Update, context: ContextTypes.DEFAULT_TYPE, key: str, text: str) -> int:
+    """Run the _LOOKUPS entry for `key` on `text` and reply with the result."""
+    check = _LOOKUP_VALIDATORS.get(key)
+    if check is not None and not check[0](text):
+        return await _reject_input(update, check[1], text)
+    label, cache, tag, func, make_args, render = _LOOKUPS[key]
+    try:
+        data = await _cached_call(cache, (tag, text), func, *make_args(text))
+        out = render(text, data)
+        if isinstance(out, str):
+            await reply_html(update, out, back_to_main_keyboard())
+        else:
+            await send_messages(update, context, out, back_to_main_keyboard())
+    except Exception as e:
+        logger.error(f"{label} error: {e}")
+        await reply_html(update, f"{E_ERROR} <b>Error:</b> {escape_html(str(e))}", back_to_main_keyboard())
+    return ConversationHandler.END
+
+
 async def _execute_search(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
     query: str,
     page: int = 1,
     facets: str = "",
+    status: str | None = None,
 ):
+    """
+    Run a search and send the result pages. An optional `status` notice is
+    sent while the Shodan call is already in flight, not before it.
+    """
     try:
-        data = await asyncio.to_thread(shodan_client.search, query, page=page, facets=facets)
+        fetch = _coalesced_call(
+            ("search", query, page, facets), shodan_client.search, query, page, facets,
+        )
+        if status is None:
+            data = await fetch
+        else:
+            _, data = await asyncio.gather(reply_html(update, status), fetch)
         if "error" in data:
             await reply_html(
                 update,
-                f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}",
+                f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}",
                 back_to_main_keyboard(),
             )
             return
@@ -844,59 +1138,67 @@ async def _execute_search(
         markup = pagination_keyboard(query, page, total) if total > 0 else back_to_main_keyboard()
         await send_messages(update, context, messages, markup)
     except Exception as e:
-        logger.error(f"Search execution error: {e}\n{traceback.format_exc()}")
+        logger.exception("Search execution error")
         await reply_html(
             update,
-            f"{EMOJI['error']} <b>Error saat pencarian:</b>\n<code>{escape_html(str(e))}</code>",
+            f"{E_ERROR} <b>Error saat pencarian:</b>\n<code>{escape_html(str(e))}</code>",
             back_to_main_keyboard(),
         )
 
 
 async def _execute_count(update: Update, context: ContextTypes.DEFAULT_TYPE, query: str):
     try:
-        data = await asyncio.to_thread(shodan_client.search_count, query, facets="org:10,port:10,country:10")
+        data = await _cached_call(
+            _COUNT_CACHE, ("count", query), shodan_client.search_count, query, _COUNT_FACETS,
+        )
         if "error" in data:
             await reply_html(
                 update,
-                f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}",
+                f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}",
                 back_to_main_keyboard(),
             )
             return
         total = data.get("total", 0)
         facets_data = data.get("facets", {})
         text = header_box("Count Result", f"Query: {query}")
-        text += f"\n\n{EMOJI['stats']} <b>Total:</b> {format_number(total)} hasil ditemukan"
-        text += f"\n{EMOJI['info']} <i>Count tidak menggunakan query credits!</i>"
+        text += f"\n\n{E_STATS} <b>Total:</b> {format_number(total)} hasil ditemukan"
+        text += f"\n{E_INFO} <i>Count tidak menggunakan query credits!</i>"
         if facets_data:
             text += format_facets(facets_data)
         await reply_html(update, text, back_to_main_keyboard())
     except Exception as e:
-        logger.error(f"Count execution error: {e}\n{traceback.format_exc()}")
+        logger.exception("Count execution error")
         await reply_html(
             update,
-            f"{EMOJI['error']} <b>Error saat count:</b>\n<code>{escape_html(str(e))}</code>",
+            f"{E_ERROR} <b>Error saat count:</b>\n<code>{escape_html(str(e))}</code>",
             back_to_main_keyboard(),
         )
 
 
 async def _execute_host(update: Update, context: ContextTypes.DEFAULT_TYPE, ip: str):
+    if not _valid_ip(ip):
+        await _reject_input(update, "IP", ip)
+        return
     try:
-        await reply_html(update, f"⏳ <i>Looking up <code>{escape_html(ip)}</code>...</i>")
-        data = await asyncio.to_thread(shodan_client.host_info, ip)
+        # Status notice and lookup are independent — overlap their round trips
+        _, data = await asyncio.gather(
+            reply_html(update, f"⏳ <i>Looking up <code>{escape_html(ip)}</code>...</i>"),
+            _cached_call(_HOST_CACHE, ("host", ip), shodan_client.host_info, ip),
+        )
         if "error" in data:
             await reply_html(
                 update,
-                f"{EMOJI['error']} <b>Error:</b> {escape_html(data['error'])}",
+                f"{E_ERROR} <b>Error:</b> {escape_html(data['error'])}",
                 back_to_main_keyboard(),
             )
             return
         messages = format_host_info(data)
         await send_messages(update, context, messages, back_to_main_keyboard())
     except Exception as e:
-        logger.error(f"Host lookup error: {e}\n{traceback.format_exc()}")
+        logger.exception("Host lookup error")
         await reply_html(
             update,
-            f"{EMOJI['error']} <b>Error saat host lookup:</b>\n<code>{escape_html(str(e))}</code>",
+            f"{E_ERROR} <b>Error saat host lookup:</b>\n<code>{escape_html(str(e))}</code>",
             back_to_main_keyboard(),
         )
 
@@ -905,23 +1207,32 @@ async def _execute_host(update: Update, context: ContextTypes.DEFAULT_TYPE, ip:
 #  TEMPLATE DETAIL FORMATTER
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+# Templates are static, so each detail card is rendered once per template id
+_TEMPLATE_DETAIL_CACHE: dict[str, str] = {}
+
+
 def format_template_detail(tmpl: SearchTemplate) -> str:
-    params_text = ""
-    for p in tmpl.params:
-        req = "wajib" if p.required else "opsional"
-        params_text += (
-            f"  {EMOJI['right']} <b>{escape_html(p.name)}</b> — "
-            f"{escape_html(p.description)} ({req})\n"
-            f"     <i>Contoh: <code>{escape_html(p.placeholder)}</code></i>\n"
-        )
+    text = _TEMPLATE_DETAIL_CACHE.get(tmpl.id)
+    if text is None:
+        text = _TEMPLATE_DETAIL_CACHE[tmpl.id] = _render_template_detail(tmpl)
+    return text
+
+
+def _render_template_detail(tmpl: SearchTemplate) -> str:
+    params_text = "".join(
+        f"  {E_RIGHT} <b>{escape_html(p.name)}</b> — "
+        f"{escape_html(p.description)} ({'wajib' if p.required else 'opsional'})\n"
+        f"     <i>Contoh: <code>{escape_html(p.placeholder)}</code></i>\n"
+        for p in tmpl.params
+    )
     return (
         f"{tmpl.emoji} <b>{escape_html(tmpl.name)}</b>\n"
         f"{'─' * 28}\n\n"
-        f"{EMOJI['info']} {escape_html(tmpl.description)}\n\n"
-        f"{EMOJI['gear']} <b>Parameter:</b>\n{params_text}\n"
-        f"{EMOJI['search']} <b>Query template:</b>\n"
+        f"{E_INFO} {escape_html(tmpl.description)}\n\n"
+        f"{E_GEAR} <b>Parameter:</b>\n{params_text}\n"
+        f"{E_SEARCH} <b>Query template:</b>\n"
         f"  <code>{escape_html(tmpl.query_template)}</code>\n\n"
-        f"{EMOJI['star']} <b>Contoh query:</b>\n"
+        f"{E_STAR} <b>Contoh query:</b>\n"
         f"  <code>{escape_html(tmpl.example)}</code>"
     )
 
@@ -930,20 +1241,31 @@ def format_template_detail(tmpl: SearchTemplate) -> str:
 #  GLOBAL ERROR HANDLER
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+# Chats notified about an error recently. During an outage or a 429 storm
+# every update fails; one notice per chat per window is plenty, and it keeps
+# the error notice itself from adding to the flood.
+_ERROR_NOTIFIED = TTLCache(maxsize=10_000, ttl=10)
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Global error handler — catches any unhandled exception and notifies the user."""
-    logger.error(f"Unhandled exception: {context.error}\n{traceback.format_exc()}")
+    # format_exc() would be empty here; the exception lives on context.error
+    logger.error(f"Unhandled exception: {context.error}", exc_info=context.error)
 
     if not isinstance(update, Update) or not update.effective_chat:
         return
+    chat_id = update.effective_chat.id
+    if chat_id in _ERROR_NOTIFIED:
+        return
+    _ERROR_NOTIFIED[chat_id] = True
 
     try:
-        error_msg = str(context.error) if context.error else "Unknown error"
+        error_msg = "Unknown error" if context.error is None else escape_html(str(context.error)[:500])
         await context.bot.send_message(
-            chat_id=update.effective_chat.id,
+            chat_id=chat_id,
             text=(
-                f"{EMOJI['error']} <b>Terjadi error:</b>\n"
-                f"<code>{escape_html(error_msg[:500])}</code>\n\n"
+                f"{E_ERROR} <b>Terjadi error:</b>\n"
+                f"<code>{error_msg}</code>\n\n"
                 f"<i>Silakan coba lagi atau gunakan /start</i>"
             ),
             parse_mode=ParseMode.HTML,
@@ -1,10 +1,17 @@
 """
 Keyboard builder — creates all inline keyboards for the bot.
+Static keyboards are built once and shared: InlineKeyboardMarkup is
+immutable in python-telegram-bot v20+, so reusing the instance is safe.
 """
 
+import hashlib
+from functools import lru_cache
+
+from cachetools import LRUCache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from templates import (
     CATEGORIES,
+    CATEGORY_ORDER,
     TEMPLATES,
     get_template_by_id,
     get_templates_by_category,
@@ -12,6 +19,7 @@ from templates import (
 )
 
 
+@lru_cache(maxsize=None)
 def main_menu_keyboard() -> InlineKeyboardMarkup:
     """Create the main menu keyboard."""
     buttons = [
@@ -39,12 +47,13 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=None)
 def categories_keyboard() -> InlineKeyboardMarkup:
     """Create category selection keyboard."""
-    sorted_cats = sorted(CATEGORIES.items(), key=lambda x: x[1]["order"])
     buttons = []
     row = []
-    for cat_id, cat_info in sorted_cats:
+    for cat_id in CATEGORY_ORDER:
+        cat_info = CATEGORIES[cat_id]
         templates_in_cat = get_templates_by_category(cat_id)
         if not templates_in_cat:
             continue
@@ -62,6 +71,7 @@ def categories_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=32)
 def templates_in_category_keyboard(category: str) -> InlineKeyboardMarkup:
     """Create keyboard with templates in a category."""
     templates = get_templates_by_category(category)
@@ -70,25 +80,64 @@ def templates_in_category_keyboard(category: str) -> InlineKeyboardMarkup:
         buttons.append([
             InlineKeyboardButton(
                 f"{tmpl.emoji} {tmpl.name}",
-                callback_data=f"tmpl:{tmpl.id}",
+                callback_data=tmpl.cb_tmpl,
             )
         ])
     buttons.append([InlineKeyboardButton("🔙 Kembali ke Kategori", callback_data="menu:templates")])
     return InlineKeyboardMarkup(buttons)
 
 
+# Templates are static, so each detail keyboard is built once per template id
+_DETAIL_KEYBOARDS: dict[str, InlineKeyboardMarkup] = {}
+
+
 def template_detail_keyboard(template: SearchTemplate) -> InlineKeyboardMarkup:
     """Show template details with 'use' and 'example' buttons."""
+    markup = _DETAIL_KEYBOARDS.get(template.id)
+    if markup is None:
+        markup = _DETAIL_KEYBOARDS[template.id] = _build_template_detail_keyboard(template)
+    return markup
+
+
+def _build_template_detail_keyboard(template: SearchTemplate) -> InlineKeyboardMarkup:
     buttons = [
         [
-            InlineKeyboardButton("✏️ Gunakan Template", callback_data=f"use:{template.id}"),
-            InlineKeyboardButton("⚡ Jalankan Contoh", callback_data=f"example:{template.id}"),
+            InlineKeyboardButton("✏️ Gunakan Template", callback_data=template.cb_use),
+            InlineKeyboardButton("⚡ Jalankan Contoh", callback_data=template.cb_example),
         ],
         [InlineKeyboardButton("🔙 Kembali", callback_data=f"cat:{template.category}")],
     ]
     return InlineKeyboardMarkup(buttons)
 
 
+# Telegram caps callback_data at 64 bytes. Pagination buttons carry the
+# query inline ("page:<n>:<query>") whenever it fits, so they survive
+# restarts and work on any instance; longer queries fall back to a short
+# token ("page:t<n>:<token>") whose query is kept here (token → query).
+_CALLBACK_DATA_LIMIT = 64
+_QUERY_TOKENS: LRUCache = LRUCache(maxsize=10_000)
+
+
+def query_token(query: str) -> str:
+    """Register `query` and return its 12-char token for callback_data."""
+    token = hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+    _QUERY_TOKENS[token] = query
+    return token
+
+
+def resolve_query_token(token: str) -> str | None:
+    """Query for a pagination token, or None if it has been evicted."""
+    return _QUERY_TOKENS.get(token)
+
+
+def _page_callback(page: int, query: str) -> str:
+    """callback_data for `page` of `query`: inline if it fits, else a token."""
+    data = f"page:{page}:{query}"
+    if len(data.encode()) <= _CALLBACK_DATA_LIMIT:
+        return data
+    return f"page:t{page}:{query_token(query)}"
+
+
 def pagination_keyboard(query: str, current_page: int, total: int, per_page: int = 5) -> InlineKeyboardMarkup:
     """Create pagination keyboard for search results."""
     total_pages = max(1, (total + per_page - 1) // per_page)
@@ -96,18 +145,30 @@ def pagination_keyboard(query: str, current_page: int, total: int, per_page: int
     row = []
 
     if current_page > 1:
-        row.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"page:{current_page - 1}:{query}"))
+        row.append(InlineKeyboardButton("⬅️ Prev", callback_data=_page_callback(current_page - 1, query)))
 
     row.append(InlineKeyboardButton(f"📄 {current_page}/{total_pages}", callback_data="noop"))
 
     if current_page < total_pages and current_page < 10:  # Limit to 10 pages
-        row.append(InlineKeyboardButton("➡️ Next", callback_data=f"page:{current_page + 1}:{query}"))
+        row.append(InlineKeyboardButton("➡️ Next", callback_data=_page_callback(current_page + 1, query)))
 
     buttons.append(row)
     buttons.append([InlineKeyboardButton("🔙 Menu Utama", callback_data="menu:main")])
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=None)
+def vuln_templates_keyboard() -> InlineKeyboardMarkup:
+    """Vulnerability templates menu (one template per row)."""
+    buttons = [
+        [InlineKeyboardButton(f"{t.emoji} {t.name}", callback_data=t.cb_tmpl)]
+        for t in get_templates_by_category("vuln")
+    ]
+    buttons.append([InlineKeyboardButton("🔙 Kembali", callback_data="menu:main")])
+    return InlineKeyboardMarkup(buttons)
+
+
+@lru_cache(maxsize=None)
 def back_to_main_keyboard() -> InlineKeyboardMarkup:
     """Simple back to main menu keyboard."""
     return InlineKeyboardMarkup([
@@ -115,6 +176,7 @@ def back_to_main_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=None)
 def dns_menu_keyboard() -> InlineKeyboardMarkup:
     """DNS tools menu."""
     buttons = [
@@ -130,6 +192,18 @@ def dns_menu_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=128)
+def param_default_keyboard(param_name: str, placeholder: str) -> InlineKeyboardMarkup:
+    """Template param prompt: use the default value, or cancel."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            f"💡 Pakai default: {placeholder}",
+            callback_data=f"default:{param_name}:{placeholder}",
+        )],
+        [InlineKeyboardButton("❌ Batal", callback_data="menu:main")],
+    ])
+
+
 def confirm_scan_keyboard(ip: str) -> InlineKeyboardMarkup:
     """Confirmation keyboard before scanning."""
     buttons = [
@@ -1,186 +1,258 @@
 """
 Shodan API wrapper — abstraction layer for all Shodan queries.
 Handles search, host lookup, DNS, exploits, stats, and more.
+Talks to the Shodan REST API directly over one shared aiohttp session,
+so calls are awaited on the event loop instead of blocking a thread.
 """
 
-import shodan
+import asyncio
 import logging
-from typing import Optional
+import time
+from functools import lru_cache, wraps
+from urllib.parse import quote
+
+import aiohttp
+import orjson
+
 from config import SHODAN_API_KEY
 
 logger = logging.getLogger(__name__)
 
+API_BASE = "https://api.shodan.io"
+EXPLOITS_BASE = "https://exploits.shodan.io/api"
+
+# How long api_info() results are reused; credit-spending calls drop it early
+API_INFO_TTL = 60.0
+
+
+class ShodanAPIError(Exception):
+    """Error returned by (or while reaching) the Shodan API."""
+
+
+@lru_cache(maxsize=64)
+def _facet_param(facets: str) -> str:
+    """
+    Normalize "org,port:5" to the API's "org:10,port:5" facet syntax.
+    Callers pass a handful of literal facet strings, so results are memoized.
+    """
+    return ",".join(
+        f if ":" in f else f"{f}:10"
+        for f in (part.strip() for part in facets.split(","))
+        if f
+    )
+
+
+def _api_call(label: str, default=None):
+    """
+    Turn a ShodanAPIError raised by the wrapped method into a logged
+    {"error": ...} result (or `default`), so methods stay straight-line.
+    """
+    def decorate(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except ShodanAPIError as e:
+                logger.error(f"Shodan {label} error: {e}")
+                return {"error": str(e)} if default is None else default
+        return wrapper
+    return decorate
+
 
 class ShodanClient:
     """Wraps the Shodan API with convenience methods."""
 
     def __init__(self):
-        self.api = shodan.Shodan(SHODAN_API_KEY)
-        self._info_cache: Optional[dict] = None
+        self.api_key = SHODAN_API_KEY
+        self._session: aiohttp.ClientSession | None = None
+        # (monotonic time, api_info result) — shared by /info and /api/health
+        self._api_info: tuple[float, dict] | None = None
+
+    # ─── HTTP plumbing ──────────────────────────────────────
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Shared session, created on first use inside the running loop.
+        Keep-alive connections and cached DNS mean only the first call
+        pays for TCP + TLS setup.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared HTTP session (if any)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, url: str, params: dict | None = None, data: dict | None = None):
+        """Call the API and return the decoded JSON body, or raise ShodanAPIError."""
+        query = {"key": self.api_key}
+        if params:
+            query.update(params)
+        try:
+            async with self._get_session().request(method, url, params=query, data=data) as resp:
+                # Search pages can be hundreds of KB; orjson decodes the raw
+                # bytes directly (no intermediate str, much faster than json)
+                body = await resp.read()
+                if resp.status >= 400:
+                    try:
+                        message = orjson.loads(body).get("error") or resp.reason
+                    except (orjson.JSONDecodeError, AttributeError):
+                        message = resp.reason
+                    raise ShodanAPIError(message)
+                try:
+                    return orjson.loads(body)
+                except orjson.JSONDecodeError as e:
+                    raise ShodanAPIError(f"Invalid JSON from Shodan: {e}") from e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ShodanAPIError(f"Unable to connect to Shodan: {e}") from e
+
+    async def _get(self, path: str, base: str = API_BASE, **params):
+        # aiohttp only accepts str/int/float query values
+        return await self._request("GET", base + path, params={
+            k: ("true" if v else "false") if isinstance(v, bool) else v
+            for k, v in params.items()
+        })
 
     # ─── Account ────────────────────────────────────────────
 
-    def account_info(self) -> dict:
-        """Get account profile + remaining credits."""
-        if not self._info_cache:
-            self._info_cache = self.api.info()
-        return self._info_cache
+    async def account_info(self) -> dict:
+        """Get account profile + remaining credits (uncached)."""
+        return await self._get("/api-info")
 
-    def api_info(self) -> dict:
-        """Return scan/query credits left."""
-        info = self.account_info()
-        return {
+    async def api_info(self) -> dict:
+        """
+        Return scan/query credits left.
+        Cached for API_INFO_TTL seconds; search and scan drop the cache so
+        spent credits show up right away.
+        """
+        now = time.monotonic()
+        if self._api_info is not None and now - self._api_info[0] < API_INFO_TTL:
+            return self._api_info[1]
+        info = await self.account_info()
+        result = {
             "scan_credits": info.get("scan_credits", 0),
             "query_credits": info.get("query_credits", 0),
             "plan": info.get("plan", "unknown"),
             "unlocked": info.get("unlocked", False),
             "unlocked_left": info.get("unlocked_left", 0),
         }
+        self._api_info = (now, result)
+        return result
+
+    def invalidate_api_info(self) -> None:
+        """Forget the cached api_info (credits were just spent)."""
+        self._api_info = None
 
     # ─── Search ─────────────────────────────────────────────
 
-    def search(self, query: str, page: int = 1, limit: int = 100, facets: str = "") -> dict:
+    @_api_call("search")
+    async def search(self, query: str, page: int = 1, facets: str = "") -> dict:
         """
         Run a Shodan search query.
         Returns dict with 'matches' and 'total'.
         """
-        try:
-            facet_list = None
-            if facets:
-                facet_list = [
-                    tuple(f.strip().split(":")) if ":" in f else (f.strip(), 10)
-                    for f in facets.split(",")
-                ]
-
-            results = self.api.search(query, page=page, limit=limit, facets=facet_list)
-            return {
-                "matches": results.get("matches", []),
-                "total": results.get("total", 0),
-                "facets": results.get("facets", {}),
-                "query": query,
-                "page": page,
-            }
-        except shodan.APIError as e:
-            logger.error(f"Shodan search error: {e}")
-            return {"error": str(e), "query": query}
-
-    def search_count(self, query: str, facets: str = "") -> dict:
+        params = {"query": query, "page": page, "minify": True}
+        if facets:
+            params["facets"] = _facet_param(facets)
+        results = await self._get("/shodan/host/search", **params)
+        # A search with filters/page > 1 spends query credits
+        self.invalidate_api_info()
+        return {
+            "matches": results.get("matches", []),
+            "total": results.get("total", 0),
+            "facets": results.get("facets", {}),
+            "query": query,
+            "page": page,
+        }
+
+    @_api_call("count")
+    async def search_count(self, query: str, facets: str = "") -> dict:
         """Count results without using query credits (uses /shodan/host/count)."""
-        try:
-            facet_list = None
-            if facets:
-                facet_list = [
-                    tuple(f.strip().split(":")) if ":" in f else (f.strip(), 10)
-                    for f in facets.split(",")
-                ]
-            results = self.api.count(query, facets=facet_list)
-            return {
-                "total": results.get("total", 0),
-                "facets": results.get("facets", {}),
-                "query": query,
-            }
-        except shodan.APIError as e:
-            logger.error(f"Shodan count error: {e}")
-            return {"error": str(e), "query": query}
+        params = {"query": query}
+        if facets:
+            params["facets"] = _facet_param(facets)
+        results = await self._get("/shodan/host/count", **params)
+        return {
+            "total": results.get("total", 0),
+            "facets": results.get("facets", {}),
+            "query": query,
+        }
 
     # ─── Host ───────────────────────────────────────────────
 
-    def host_info(self, ip: str, history: bool = False, minify: bool = False) -> dict:
+    @_api_call("host")
+    async def host_info(self, ip: str, history: bool = False, minify: bool = False) -> dict:
         """Lookup a specific IP address."""
-        try:
-            return self.api.host(ip, history=history, minify=minify)
-        except shodan.APIError as e:
-            logger.error(f"Shodan host error: {e}")
-            return {"error": str(e), "ip": ip}
+        return await self._get(f"/shodan/host/{quote(ip, safe='')}", history=history, minify=minify)
 
     # ─── DNS ────────────────────────────────────────────────
 
-    def dns_resolve(self, hostnames: list[str]) -> dict:
+    @_api_call("DNS resolve")
+    async def dns_resolve(self, hostnames: list[str]) -> dict:
         """Resolve hostnames to IPs."""
-        try:
-            return self.api.dns.resolve(hostnames)
-        except shodan.APIError as e:
-            logger.error(f"Shodan DNS resolve error: {e}")
-            return {"error": str(e)}
+        return await self._get("/dns/resolve", hostnames=",".join(hostnames))
 
-    def dns_reverse(self, ips: list[str]) -> dict:
+    @_api_call("DNS reverse")
+    async def dns_reverse(self, ips: list[str]) -> dict:
         """Reverse DNS lookup."""
-        try:
-            return self.api.dns.reverse(ips)
-        except shodan.APIError as e:
-            logger.error(f"Shodan DNS reverse error: {e}")
-            return {"error": str(e)}
+        return await self._get("/dns/reverse", ips=",".join(ips))
 
-    def dns_domain(self, domain: str) -> dict:
+    @_api_call("domain")
+    async def dns_domain(self, domain: str) -> dict:
         """Get DNS records for a domain."""
-        try:
-            return self.api.dns.domain_info(domain)
-        except Exception:
-            # Fallback: some versions use different method names
-            try:
-                return self.api.get_domain(domain)
-            except shodan.APIError as e:
-                logger.error(f"Shodan domain error: {e}")
-                return {"error": str(e)}
+        return await self._get(f"/dns/domain/{quote(domain, safe='')}")
 
     # ─── Exploits ───────────────────────────────────────────
 
-    def search_exploits(self, query: str, page: int = 1) -> dict:
+    @_api_call("exploit search")
+    async def search_exploits(self, query: str, page: int = 1) -> dict:
         """Search for exploits."""
-        try:
-            results = self.api.exploits.search(query, page=page)
-            return {
-                "matches": results.get("matches", []),
-                "total": results.get("total", 0),
-                "query": query,
-            }
-        except shodan.APIError as e:
-            logger.error(f"Shodan exploit search error: {e}")
-            return {"error": str(e), "query": query}
+        results = await self._get("/search", base=EXPLOITS_BASE, query=query, page=page)
+        return {
+            "matches": results.get("matches", []),
+            "total": results.get("total", 0),
+            "query": query,
+        }
 
     # ─── Scanning ───────────────────────────────────────────
 
-    def scan_ip(self, ips: str) -> dict:
+    @_api_call("scan")
+    async def scan_ip(self, ips: str) -> dict:
         """Request Shodan to scan an IP/network."""
-        try:
-            return self.api.scan(ips)
-        except shodan.APIError as e:
-            logger.error(f"Shodan scan error: {e}")
-            return {"error": str(e)}
+        result = await self._request("POST", f"{API_BASE}/shodan/scan", data={"ips": ips})
+        self.invalidate_api_info()  # scan credits were spent
+        return result
 
-    def scan_status(self, scan_id: str) -> dict:
+    @_api_call("scan status")
+    async def scan_status(self, scan_id: str) -> dict:
         """Check the status of a scan."""
-        try:
-            return self.api.scan_status(scan_id)
-        except shodan.APIError as e:
-            logger.error(f"Shodan scan status error: {e}")
-            return {"error": str(e)}
+        return await self._get(f"/shodan/scan/{quote(scan_id, safe='')}")
 
     # ─── Protocols & Services ───────────────────────────────
 
-    def protocols(self) -> dict:
+    @_api_call("protocols")
+    async def protocols(self) -> dict:
         """List protocols Shodan can scan for."""
-        try:
-            return self.api.protocols()
-        except shodan.APIError as e:
-            logger.error(f"Shodan protocols error: {e}")
-            return {"error": str(e)}
+        return await self._get("/shodan/protocols")
 
-    def services(self) -> dict:
+    @_api_call("services")
+    async def services(self) -> dict:
         """List common services/ports."""
-        try:
-            return self.api.services()
-        except shodan.APIError as e:
-            logger.error(f"Shodan services error: {e}")
-            return {"error": str(e)}
+        return await self._get("/shodan/services")
 
     # ─── Honeypot detection ─────────────────────────────────
 
-    def honeypot_score(self, ip: str) -> float:
+    async def honeypot_score(self, ip: str) -> float:
         """Get honeypot score for an IP (0 = not honeypot, 1 = honeypot)."""
         try:
-            return self.api.labs.honeyscore(ip)
-        except shodan.APIError as e:
+            return float(await self._get(f"/labs/honeyscore/{quote(ip, safe='')}"))
+        except (ShodanAPIError, TypeError, ValueError) as e:
             logger.error(f"Shodan honeypot error: {e}")
             return -1.0
 
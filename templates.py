@@ -12,9 +12,12 @@ Each template has:
 """
 
 from dataclasses import dataclass, field
+from functools import lru_cache
+from string import Formatter
+from types import MappingProxyType
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SearchParam:
     name: str
     description: str
@@ -22,18 +25,40 @@ class SearchParam:
     required: bool = True
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SearchTemplate:
     id: str
     name: str
     description: str
     emoji: str
     query_template: str
-    params: list[SearchParam]
+    params: tuple[SearchParam, ...]
     category: str
     example: str
     facets: str = ""
-    tags: list[str] = field(default_factory=list)
+    tags: tuple[str, ...] = ()
+    # callback_data for this template's buttons, built once
+    cb_tmpl: str = field(init=False, repr=False, compare=False)
+    cb_use: str = field(init=False, repr=False, compare=False)
+    cb_example: str = field(init=False, repr=False, compare=False)
+    # param name → placeholder, the fallback values for build_query
+    param_defaults: MappingProxyType = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # build_query relies on query_template fields matching params exactly
+        fields = {f for _, f, _, _ in Formatter().parse(self.query_template) if f is not None}
+        names = {p.name for p in self.params}
+        if fields != names:
+            raise ValueError(
+                f"Template {self.id!r}: placeholders {sorted(fields)} "
+                f"don't match params {sorted(names)}"
+            )
+        # Frozen: derived fields have to bypass the generated __setattr__
+        set_field = object.__setattr__
+        set_field(self, "cb_tmpl", f"tmpl:{self.id}")
+        set_field(self, "cb_use", f"use:{self.id}")
+        set_field(self, "cb_example", f"example:{self.id}")
+        set_field(self, "param_defaults", MappingProxyType({p.name: p.placeholder for p in self.params}))
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -52,11 +77,21 @@ CATEGORIES = {
     "custom": {"name": "⚙️ Custom / Raw Query", "order": 9},
 }
 
+# Category ids in menu order, sorted once
+CATEGORY_ORDER: tuple[str, ...] = tuple(sorted(CATEGORIES, key=lambda k: CATEGORIES[k]["order"]))
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  ALL SEARCH TEMPLATES
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-TEMPLATES: list[SearchTemplate] = [
+# Params shared by several templates (frozen, so one instance serves all)
+_PARAM_COUNTRY = SearchParam("country", "Kode negara", "ID")
+_PARAM_COUNTRY_ISO = SearchParam("country", "Kode negara (2 huruf)", "ID")
+_PARAM_CITY = SearchParam("city", "Nama kota", "Jakarta")
+_PARAM_PRODUCT = SearchParam("product", "Nama product/service", "nginx")
+_PARAM_CVE = SearchParam("cve", "CVE ID", "CVE-2021-44228")
+
+TEMPLATES: tuple[SearchTemplate, ...] = (
 
     # ─── NETWORK & INFRASTRUCTURE ───────────────────────────
 
@@ -66,13 +101,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari semua perangkat milik ISP / provider tertentu di suatu negara",
         emoji="📶",
         query_template='org:"{org}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("org", "Nama ISP/Provider", "Telkom Indonesia"),
-            SearchParam("country", "Kode negara (2 huruf)", "ID"),
-        ],
+            _PARAM_COUNTRY_ISO,
+        ),
         category="network",
         example='org:"Telkom Indonesia" country:"ID"',
-        tags=["isp", "provider", "telkom"],
+        tags=("isp", "provider", "telkom"),
     ),
     SearchTemplate(
         id="net_port_country",
@@ -80,13 +115,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat dengan port tertentu terbuka di suatu negara",
         emoji="🔌",
         query_template='port:{port} country:"{country}"',
-        params=[
+        params=(
             SearchParam("port", "Nomor port", "22"),
-            SearchParam("country", "Kode negara (2 huruf)", "ID"),
-        ],
+            _PARAM_COUNTRY_ISO,
+        ),
         category="network",
         example='port:22 country:"ID"',
-        tags=["port", "ssh", "open"],
+        tags=("port", "ssh", "open"),
     ),
     SearchTemplate(
         id="net_service_city",
@@ -94,14 +129,14 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari service tertentu di kota spesifik",
         emoji="🏙️",
         query_template='product:"{product}" city:"{city}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("product", "Nama service/product", "nginx"),
-            SearchParam("city", "Nama kota", "Jakarta"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_CITY,
+            _PARAM_COUNTRY,
+        ),
         category="network",
         example='product:"nginx" city:"Jakarta" country:"ID"',
-        tags=["service", "city"],
+        tags=("service", "city"),
     ),
     SearchTemplate(
         id="net_asn",
@@ -109,12 +144,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat berdasarkan Autonomous System Number",
         emoji="🔢",
         query_template="asn:{asn}",
-        params=[
+        params=(
             SearchParam("asn", "ASN number (contoh: AS17974)", "AS17974"),
-        ],
+        ),
         category="network",
         example="asn:AS17974",
-        tags=["asn", "bgp"],
+        tags=("asn", "bgp"),
     ),
     SearchTemplate(
         id="net_subnet",
@@ -122,12 +157,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat dalam subnet tertentu",
         emoji="🔀",
         query_template="net:{cidr}",
-        params=[
+        params=(
             SearchParam("cidr", "Subnet CIDR", "202.134.0.0/16"),
-        ],
+        ),
         category="network",
         example="net:202.134.0.0/16",
-        tags=["subnet", "cidr", "network"],
+        tags=("subnet", "cidr", "network"),
     ),
     SearchTemplate(
         id="net_hostname",
@@ -135,12 +170,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat berdasarkan hostname/domain",
         emoji="🏷️",
         query_template='hostname:"{hostname}"',
-        params=[
+        params=(
             SearchParam("hostname", "Hostname atau domain", ".go.id"),
-        ],
+        ),
         category="network",
         example='hostname:".go.id"',
-        tags=["hostname", "domain", "dns"],
+        tags=("hostname", "domain", "dns"),
     ),
     SearchTemplate(
         id="net_os_country",
@@ -148,13 +183,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat dengan OS tertentu di negara tertentu",
         emoji="💻",
         query_template='os:"{os}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("os", "Nama operating system", "Windows 10"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="network",
         example='os:"Windows 10" country:"ID"',
-        tags=["os", "windows", "linux"],
+        tags=("os", "windows", "linux"),
     ),
 
     # ─── WEB SERVERS & APPS ─────────────────────────────────
@@ -165,13 +200,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari web server (Apache/Nginx/IIS) di negara tertentu",
         emoji="🌍",
         query_template='http.server:"{server}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("server", "Nama web server", "Apache"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="web",
         example='http.server:"Apache" country:"ID"',
-        tags=["web", "apache", "nginx", "iis"],
+        tags=("web", "apache", "nginx", "iis"),
     ),
     SearchTemplate(
         id="web_title",
@@ -179,12 +214,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari website berdasarkan judul halaman",
         emoji="📄",
         query_template='http.title:"{title}"',
-        params=[
+        params=(
             SearchParam("title", "Judul halaman web", "Dashboard"),
-        ],
+        ),
         category="web",
         example='http.title:"Dashboard"',
-        tags=["title", "web", "html"],
+        tags=("title", "web", "html"),
     ),
     SearchTemplate(
         id="web_component",
@@ -192,13 +227,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari website yang menggunakan teknologi tertentu",
         emoji="⚙️",
         query_template='http.component:"{component}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("component", "Nama teknologi (WordPress, jQuery, dll)", "WordPress"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="web",
         example='http.component:"WordPress" country:"ID"',
-        tags=["wordpress", "component", "technology"],
+        tags=("wordpress", "component", "technology"),
     ),
     SearchTemplate(
         id="web_favicon",
@@ -206,12 +241,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari website berdasarkan favicon hash (untuk identifikasi app)",
         emoji="🖼️",
         query_template="http.favicon.hash:{hash}",
-        params=[
+        params=(
             SearchParam("hash", "Favicon hash number", "116323821"),
-        ],
+        ),
         category="web",
         example="http.favicon.hash:116323821",
-        tags=["favicon", "hash", "fingerprint"],
+        tags=("favicon", "hash", "fingerprint"),
     ),
     SearchTemplate(
         id="web_ssl_org",
@@ -219,12 +254,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari berdasarkan organisasi di SSL certificate",
         emoji="🔒",
         query_template='ssl.cert.subject.O:"{org}"',
-        params=[
+        params=(
             SearchParam("org", "Nama organisasi di SSL cert", "Government of Indonesia"),
-        ],
+        ),
         category="web",
         example='ssl.cert.subject.O:"Government of Indonesia"',
-        tags=["ssl", "certificate", "tls"],
+        tags=("ssl", "certificate", "tls"),
     ),
     SearchTemplate(
         id="web_ssl_expired",
@@ -232,12 +267,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari website dengan SSL certificate yang sudah expired",
         emoji="🔓",
         query_template='ssl.cert.expired:true country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="web",
         example='ssl.cert.expired:true country:"ID"',
-        tags=["ssl", "expired", "security"],
+        tags=("ssl", "expired", "security"),
     ),
     SearchTemplate(
         id="web_http_status",
@@ -245,13 +280,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari web berdasarkan HTTP status code",
         emoji="📊",
         query_template='http.status:{status} country:"{country}"',
-        params=[
+        params=(
             SearchParam("status", "HTTP status code", "200"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="web",
         example='http.status:200 country:"ID"',
-        tags=["http", "status"],
+        tags=("http", "status"),
     ),
 
     # ─── IoT & CAMERAS ─────────────────────────────────────
@@ -262,13 +297,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari IP camera / webcam yang terekspos",
         emoji="📷",
         query_template='product:"{brand}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("brand", "Merk kamera (Hikvision, Dahua, dll)", "Hikvision"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="iot",
         example='product:"Hikvision" country:"ID"',
-        tags=["camera", "webcam", "cctv", "hikvision"],
+        tags=("camera", "webcam", "cctv", "hikvision"),
     ),
     SearchTemplate(
         id="iot_router",
@@ -276,13 +311,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari router admin panel yang terekspos",
         emoji="📡",
         query_template='http.title:"{router_type}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("router_type", "Tipe router (MikroTik, TP-Link)", "MikroTik"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="iot",
         example='http.title:"MikroTik" country:"ID"',
-        tags=["router", "mikrotik", "admin"],
+        tags=("router", "mikrotik", "admin"),
     ),
     SearchTemplate(
         id="iot_printer",
@@ -290,12 +325,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari printer yang terekspos ke internet",
         emoji="🖨️",
         query_template='port:9100 country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="iot",
         example='port:9100 country:"ID"',
-        tags=["printer", "iot"],
+        tags=("printer", "iot"),
     ),
     SearchTemplate(
         id="iot_mqtt",
@@ -303,12 +338,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari MQTT broker (IoT messaging) yang terekspos",
         emoji="📨",
         query_template='product:"MQTT" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="iot",
         example='product:"MQTT" country:"ID"',
-        tags=["mqtt", "iot", "broker"],
+        tags=("mqtt", "iot", "broker"),
     ),
 
     # ─── ICS / SCADA ────────────────────────────────────────
@@ -319,13 +354,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat ICS/SCADA berdasarkan tag",
         emoji="🏭",
         query_template='tag:"{tag}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("tag", "Tag ICS (ics, scada)", "ics"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="industrial",
         example='tag:"ics" country:"ID"',
-        tags=["scada", "ics", "industrial"],
+        tags=("scada", "ics", "industrial"),
     ),
     SearchTemplate(
         id="ics_modbus",
@@ -333,12 +368,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat Modbus (ICS protocol)",
         emoji="⚡",
         query_template='port:502 country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="industrial",
         example='port:502 country:"ID"',
-        tags=["modbus", "ics"],
+        tags=("modbus", "ics"),
     ),
     SearchTemplate(
         id="ics_plc",
@@ -346,13 +381,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari Programmable Logic Controller",
         emoji="🔧",
         query_template='product:"{plc_brand}" country:"{country}"',
-        params=[
+        params=(
             SearchParam("plc_brand", "Merk PLC (Siemens, Allen-Bradley)", "Siemens"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+            _PARAM_COUNTRY,
+        ),
         category="industrial",
         example='product:"Siemens" country:"ID"',
-        tags=["plc", "siemens"],
+        tags=("plc", "siemens"),
     ),
 
     # ─── DATABASES ──────────────────────────────────────────
@@ -363,12 +398,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari MongoDB database yang terekspos",
         emoji="🍃",
         query_template='product:"MongoDB" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="database",
         example='product:"MongoDB" country:"ID"',
-        tags=["mongodb", "nosql", "database"],
+        tags=("mongodb", "nosql", "database"),
     ),
     SearchTemplate(
         id="db_elastic",
@@ -376,12 +411,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari Elasticsearch cluster yang terekspos",
         emoji="🔎",
         query_template='product:"Elastic" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="database",
         example='product:"Elastic" country:"ID"',
-        tags=["elasticsearch", "elastic", "database"],
+        tags=("elasticsearch", "elastic", "database"),
     ),
     SearchTemplate(
         id="db_redis",
@@ -389,12 +424,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari Redis server yang terekspos",
         emoji="🔴",
         query_template='product:"Redis" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="database",
         example='product:"Redis" country:"ID"',
-        tags=["redis", "database", "cache"],
+        tags=("redis", "database", "cache"),
     ),
     SearchTemplate(
         id="db_mysql",
@@ -402,12 +437,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari MySQL server yang terekspos",
         emoji="🐬",
         query_template='product:"MySQL" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="database",
         example='product:"MySQL" country:"ID"',
-        tags=["mysql", "database", "sql"],
+        tags=("mysql", "database", "sql"),
     ),
     SearchTemplate(
         id="db_postgres",
@@ -415,12 +450,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari PostgreSQL server yang terekspos",
         emoji="🐘",
         query_template='product:"PostgreSQL" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="database",
         example='product:"PostgreSQL" country:"ID"',
-        tags=["postgres", "postgresql", "database"],
+        tags=("postgres", "postgresql", "database"),
     ),
 
     # ─── VULNERABILITIES ────────────────────────────────────
@@ -431,12 +466,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat yang rentan terhadap CVE tertentu",
         emoji="🛡️",
         query_template='vuln:"{cve}"',
-        params=[
-            SearchParam("cve", "CVE ID", "CVE-2021-44228"),
-        ],
+        params=(
+            _PARAM_CVE,
+        ),
         category="vuln",
         example='vuln:"CVE-2021-44228"',
-        tags=["cve", "vulnerability"],
+        tags=("cve", "vulnerability"),
     ),
     SearchTemplate(
         id="vuln_cve_country",
@@ -444,13 +479,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat rentan CVE tertentu di negara spesifik",
         emoji="🚨",
         query_template='vuln:"{cve}" country:"{country}"',
-        params=[
-            SearchParam("cve", "CVE ID", "CVE-2021-44228"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_CVE,
+            _PARAM_COUNTRY,
+        ),
         category="vuln",
         example='vuln:"CVE-2021-44228" country:"ID"',
-        tags=["cve", "vulnerability", "country"],
+        tags=("cve", "vulnerability", "country"),
     ),
     SearchTemplate(
         id="vuln_has_vuln",
@@ -458,12 +493,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari semua perangkat yang punya vulnerability di negara tertentu",
         emoji="💥",
         query_template='has_vuln:true country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="vuln",
         example='has_vuln:true country:"ID"',
-        tags=["vulnerability", "vuln"],
+        tags=("vulnerability", "vuln"),
     ),
     SearchTemplate(
         id="vuln_default_pass",
@@ -471,12 +506,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari perangkat dengan password default",
         emoji="🔑",
         query_template='"default password" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="vuln",
         example='"default password" country:"ID"',
-        tags=["password", "default", "credential"],
+        tags=("password", "default", "credential"),
     ),
 
     # ─── CLOUD ──────────────────────────────────────────────
@@ -487,12 +522,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari services yang berjalan di AWS",
         emoji="☁️",
         query_template='org:"Amazon" product:"{product}"',
-        params=[
-            SearchParam("product", "Nama product/service", "nginx"),
-        ],
+        params=(
+            _PARAM_PRODUCT,
+        ),
         category="cloud",
         example='org:"Amazon" product:"nginx"',
-        tags=["aws", "amazon", "cloud"],
+        tags=("aws", "amazon", "cloud"),
     ),
     SearchTemplate(
         id="cloud_gcp",
@@ -500,12 +535,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari services yang berjalan di Google Cloud",
         emoji="🌈",
         query_template='org:"Google Cloud" product:"{product}"',
-        params=[
-            SearchParam("product", "Nama product/service", "nginx"),
-        ],
+        params=(
+            _PARAM_PRODUCT,
+        ),
         category="cloud",
         example='org:"Google Cloud" product:"nginx"',
-        tags=["gcp", "google", "cloud"],
+        tags=("gcp", "google", "cloud"),
     ),
     SearchTemplate(
         id="cloud_azure",
@@ -513,12 +548,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari services yang berjalan di Microsoft Azure",
         emoji="🔷",
         query_template='org:"Microsoft Azure" product:"{product}"',
-        params=[
-            SearchParam("product", "Nama product/service", "nginx"),
-        ],
+        params=(
+            _PARAM_PRODUCT,
+        ),
         category="cloud",
         example='org:"Microsoft Azure" product:"nginx"',
-        tags=["azure", "microsoft", "cloud"],
+        tags=("azure", "microsoft", "cloud"),
     ),
     SearchTemplate(
         id="cloud_digitalocean",
@@ -526,12 +561,12 @@ TEMPLATES: list[SearchTemplate] = [
         description="Cari services di DigitalOcean",
         emoji="🌊",
         query_template='org:"DigitalOcean" country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY,
+        ),
         category="cloud",
         example='org:"DigitalOcean" country:"ID"',
-        tags=["digitalocean", "cloud"],
+        tags=("digitalocean", "cloud"),
     ),
 
     # ─── BY COUNTRY / REGION ───────────────────────────────
@@ -542,13 +577,13 @@ TEMPLATES: list[SearchTemplate] = [
         description="Lihat ringkasan semua service yang terekspos di suatu negara",
         emoji="🗺️",
         query_template='country:"{country}"',
-        params=[
-            SearchParam("country", "Kode negara (2 huruf)", "ID"),
-        ],
+        params=(
+            _PARAM_COUNTRY_ISO,
+        ),
         category="country",
         example='country:"ID"',
         facets="org:10,port:10,product:10,os:5",
-        tags=["country", "overview", "stats"],
+        tags=("country", "overview", "stats"),
     ),
     SearchTemplate(
         id="region_city",
@@ -556,50 +591,70 @@ TEMPLATES: list[SearchTemplate] = [
         description="Lihat ringkasan perangkat terekspos di kota tertentu",
         emoji="🏙️",
         query_template='city:"{city}" country:"{country}"',
-        params=[
-            SearchParam("city", "Nama kota", "Jakarta"),
-            SearchParam("country", "Kode negara", "ID"),
-        ],
+        params=(
+            _PARAM_CITY,
+            _PARAM_COUNTRY,
+        ),
         category="country",
         example='city:"Jakarta" country:"ID"',
         facets="org:10,port:10,product:10",
-        tags=["city", "overview"],
+        tags=("city", "overview"),
     ),
-]
+)
+
+
+# ─── Lookup indexes (built once at import) ──────────────────
+
+def _build_indexes(templates: tuple[SearchTemplate, ...]):
+    """
+    Build every lookup structure in a single pass over the templates:
+    id → template, category → templates, and the keyword-search haystacks
+    (lowercased name/description/tags, NUL-separated so a keyword can
+    never match across two fields).
+    """
+    by_id: dict[str, SearchTemplate] = {}
+    by_category: dict[str, list[SearchTemplate]] = {}
+    haystacks: list[tuple[str, SearchTemplate]] = []
+    for t in templates:
+        by_id[t.id] = t
+        by_category.setdefault(t.category, []).append(t)
+        haystacks.append(("\0".join((t.name.lower(), t.description.lower(), *t.tags)), t))
+    return (
+        by_id,
+        {cat: tuple(items) for cat, items in by_category.items()},
+        tuple(haystacks),
+    )
+
+
+TEMPLATES_BY_ID: dict[str, SearchTemplate]
+TEMPLATES_BY_CATEGORY: dict[str, tuple[SearchTemplate, ...]]
+_HAYSTACKS: tuple[tuple[str, SearchTemplate], ...]
+TEMPLATES_BY_ID, TEMPLATES_BY_CATEGORY, _HAYSTACKS = _build_indexes(TEMPLATES)
 
 
 def get_template_by_id(template_id: str) -> SearchTemplate | None:
     """Get template by its unique ID."""
-    for t in TEMPLATES:
-        if t.id == template_id:
-            return t
-    return None
+    return TEMPLATES_BY_ID.get(template_id)
 
 
-def get_templates_by_category(category: str) -> list[SearchTemplate]:
-    """Get all templates in a category."""
-    return [t for t in TEMPLATES if t.category == category]
+def get_templates_by_category(category: str) -> tuple[SearchTemplate, ...]:
+    """Get all templates in a category (shared, read-only)."""
+    return TEMPLATES_BY_CATEGORY.get(category, ())
 
 
-def search_templates(keyword: str) -> list[SearchTemplate]:
+@lru_cache(maxsize=256)
+def search_templates(keyword: str) -> tuple[SearchTemplate, ...]:
     """Search templates by keyword in name, description, or tags."""
     keyword = keyword.lower()
-    results = []
-    for t in TEMPLATES:
-        if (
-            keyword in t.name.lower()
-            or keyword in t.description.lower()
-            or any(keyword in tag for tag in t.tags)
-        ):
-            results.append(t)
-    return results
+    if "\0" in keyword:
+        return ()
+    return tuple(t for haystack, t in _HAYSTACKS if keyword in haystack)
 
 
 def build_query(template: SearchTemplate, values: dict[str, str]) -> str:
-    """Build a Shodan query string from template + user values."""
-    query = template.query_template
-    for param in template.params:
-        placeholder = "{" + param.name + "}"
-        value = values.get(param.name, param.placeholder)
-        query = query.replace(placeholder, value)
-    return query
+    """
+    Build a Shodan query string from template + user values.
+    query_template fields are checked against params at import, so one
+    format_map fills them all; missing values fall back to the placeholder.
+    """
+    return template.query_template.format_map({**template.param_defaults, **values})